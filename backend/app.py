@@ -1,7 +1,8 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_cors import CORS
-from config import UPLOAD_FOLDER
+from config import UPLOAD_FOLDER, WARMUP_ON_START
 import os
+import threading
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
@@ -9,12 +10,30 @@ CORS(app)
 
 from routes.detect import detect_bp
 from routes.ocr import ocr_bp
-from routes.current_affairs import news_bp
+from routes.current_affairs import news_bp, start_news_refresher
 from routes.url import url_bp
 app.register_blueprint(detect_bp, url_prefix="/api/detect")
 app.register_blueprint(ocr_bp, url_prefix="/api/ocr")
 app.register_blueprint(news_bp, url_prefix="/api/news")
 app.register_blueprint(url_bp, url_prefix="/api/url-check")
 
+from models.text_model import warmup, get_model_status
+
+@app.route("/api/health/live", methods=["GET"])
+def live():
+    return jsonify({"status": "ok"})
+
+@app.route("/api/health/ready", methods=["GET"])
+def ready():
+    status = get_model_status()
+    return jsonify(status), 200 if status["ready"] else 503
+
+# Background startup work. Skip the debug reloader's parent process, which never serves requests.
+if __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    # Warm the model up in the background so the server can answer health checks meanwhile
+    if WARMUP_ON_START:
+        threading.Thread(target=warmup, name="model-warmup", daemon=True).start()
+    start_news_refresher()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
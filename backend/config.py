@@ -8,6 +8,8 @@ load_dotenv()
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Uploads up to this size stay in memory; larger ones spill to a temp file in UPLOAD_FOLDER
+UPLOAD_SPILL_BYTES = int(os.getenv("UPLOAD_SPILL_BYTES", str(8 * 1024 * 1024)))
 
 # API keys and model configurations
 UNSPLASH_ACCESS_KEY = os.getenv("UNSPLASH_ACCESS_KEY")
@@ -18,6 +20,18 @@ SERPAPI_KEY = os.getenv("SERPAPI_KEY")
 
 # Default model name (fallback if not set in .env)
 TEXT_MODEL_NAME = os.getenv("TEXT_MODEL_NAME", "hamzab/roberta-fake-news-classification")
+# Inference backend for the text model: torch | int8 | onnx
+TEXT_MODEL_BACKEND = os.getenv("TEXT_MODEL_BACKEND", "torch")
+
+# Verification providers: any of newsapi, gnews, local (offline index built with `python -m models.news_index build`)
+VERIFY_PROVIDERS = os.getenv("VERIFY_PROVIDERS", "newsapi,gnews")
+
+# Reuse verdicts of previously checked claims for close paraphrases (loads a small sentence encoder).
+# Off by default: sentence embeddings place some opposite claims close together
+CLAIM_STORE_ENABLED = os.getenv("CLAIM_STORE_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Load and warm up the text model when the app starts instead of on the first request
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "true").lower() in ("1", "true", "yes")
 
 # Optional: Debug print for development only
 if not os.getenv("FLASK_ENV") == "production":
@@ -28,3 +42,5 @@ if not os.getenv("FLASK_ENV") == "production":
     print(f"GNEWSAPI_KEY: {'Set' if NEWSAPI_KEY else 'Missing'}")
     print(f"SERPAPI_KEY: {'Set' if NEWSAPI_KEY else 'Missing'}")
     print(f"TEXT_MODEL_NAME: {TEXT_MODEL_NAME}")
+    print(f"TEXT_MODEL_BACKEND: {TEXT_MODEL_BACKEND}")
+    print(f"VERIFY_PROVIDERS: {VERIFY_PROVIDERS}")
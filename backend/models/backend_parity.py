@@ -0,0 +1,106 @@
+"""
+Compares predictions of an alternative inference backend (int8 / onnx)
+against the fp32 torch backend on a sample set.
+
+Usage (from backend/):
+    python -m models.backend_parity --backend int8
+    python -m models.backend_parity --backend onnx --samples True.csv --limit 200
+"""
+import argparse
+import csv
+import time
+
+from models.text_model import build_classifier, prepare_text
+
+DEFAULT_SAMPLES = [
+    "Scientists confirm the moon is made entirely of cheese, NASA says.",
+    "The central bank raised interest rates by a quarter point on Wednesday, citing persistent inflation.",
+    "Drinking hot water every 15 minutes cures all viral infections, doctors reveal.",
+    "The World Health Organization said on Monday that measles cases rose sharply across Europe last year.",
+    "Government to give every citizen a free car before the elections, leaked memo shows.",
+    "Heavy rain caused flooding in several districts, and officials urged residents to avoid travel.",
+    "Celebrity reveals secret trick that banks don't want you to know about.",
+    "The parliament passed the budget bill after a lengthy debate late on Thursday.",
+]
+
+FAKE_LABELS = ("FAKE", "LABEL_0", "NEGATIVE", "UNRELIABLE")
+
+
+def load_samples(path, limit):
+    if not path:
+        return DEFAULT_SAMPLES[:limit]
+    if path.endswith(".csv"):
+        texts = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                title = row.get("title") or ""
+                body = row.get("text") or ""
+                texts.append(f"{title}. {body}" if title else body)
+                if len(texts) >= limit:
+                    break
+        return texts
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()][:limit]
+
+
+def predict(clf, texts, batch_size):
+    started = time.perf_counter()
+    outputs = clf([t[:512] for t in texts], batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+    outputs = [o[0] if isinstance(o, list) else o for o in outputs]
+    return outputs, elapsed
+
+
+def to_prediction(output):
+    return "FAKE" if output.get("label", "").upper() in FAKE_LABELS else "REAL"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="int8", choices=["int8", "onnx"])
+    parser.add_argument("--samples", help="Text file (one sample per line) or CSV with title/text columns")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="Max allowed absolute score difference on agreeing predictions")
+    args = parser.parse_args()
+
+    texts = [prepare_text(t)[0] for t in load_samples(args.samples, args.limit)]
+    print(f"Comparing torch vs {args.backend} on {len(texts)} samples...")
+
+    _, _, reference = build_classifier("torch")
+    _, _, candidate = build_classifier(args.backend)
+
+    # Warm both up so load time doesn't count as latency
+    reference(texts[:1]); candidate(texts[:1])
+
+    ref_out, ref_time = predict(reference, texts, args.batch_size)
+    cand_out, cand_time = predict(candidate, texts, args.batch_size)
+
+    agree = 0
+    max_diff = 0.0
+    mismatches = []
+    for text, r, c in zip(texts, ref_out, cand_out):
+        if to_prediction(r) == to_prediction(c):
+            agree += 1
+            max_diff = max(max_diff, abs(r["score"] - c["score"]))
+        else:
+            mismatches.append((text[:80], r, c))
+
+    agreement = agree / len(texts) if texts else 0.0
+    print(f"\n{'Agreement:':<18}{agreement:.2%} ({agree}/{len(texts)})")
+    print(f"{'Max score diff:':<18}{max_diff:.4f}")
+    print(f"{'torch latency:':<18}{ref_time / len(texts) * 1000:.1f} ms/text")
+    print(f"{args.backend + ' latency:':<18}{cand_time / len(texts) * 1000:.1f} ms/text")
+    print(f"{'Speedup:':<18}{ref_time / cand_time:.2f}x")
+
+    for text, r, c in mismatches[:10]:
+        print(f"  MISMATCH: {text!r} torch={r} {args.backend}={c}")
+
+    ok = not mismatches and max_diff <= args.tolerance
+    print("\n✅ Parity OK" if ok else "\n❌ Parity check failed")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
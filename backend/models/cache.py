@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# The on-disk table is pruned (expired rows, then oldest beyond maxsize) every this many writes
+PRUNE_EVERY = 100
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after `ttl` seconds.
+    If `db_path` is given, entries are also written to SQLite so they
+    survive restarts (values must be JSON-serializable). The table is kept
+    to `maxsize` rows as well, dropping the soonest-to-expire first.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600, db_path: Optional[str] = None, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._writes = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)")
+            self._prune()
+            self._db.commit()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+
+            if self._db is not None:
+                row = self._db.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+                if row and row[1] > now:
+                    value = json.loads(row[0])
+                    self._store(key, value, row[1])
+                    self.hits += 1
+                    return value
+                if row:
+                    self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store(key, value, expires)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                        (key, json.dumps(value), expires)
+                    )
+                    self._writes += 1
+                    if self._writes % PRUNE_EVERY == 0:
+                        self._prune()
+                    self._db.commit()
+                except (TypeError, sqlite3.Error) as e:
+                    print(f"{self.name}: could not persist entry: {e}")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache")
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "persistent": self._db is not None
+            }
+
+    def _prune(self) -> None:
+        # Caller must hold the lock (or be __init__) and commit
+        self._db.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        excess = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.maxsize
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires LIMIT ?)", (excess,)
+            )
+
+    def _store(self, key: str, value: Any, expires: float) -> None:
+        # Caller must hold the lock
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
@@ -0,0 +1,270 @@
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+from models.embeddings import get_encoder
+from models.relevance import terms
+
+# ----------------------
+# Configuration
+# ----------------------
+# Off by default: sentence embeddings place some opposite claims close together
+CLAIM_STORE_ENABLED = os.environ.get("CLAIM_STORE_ENABLED", "false").lower() in ("1", "true", "yes")
+CLAIM_STORE_SIZE = int(os.environ.get("CLAIM_STORE_SIZE", "50000"))
+CLAIM_STORE_TTL = float(os.environ.get("CLAIM_STORE_TTL", "86400"))
+# Max cosine distance (1 - cosine similarity) for a new text to reuse a stored verdict
+CLAIM_MATCH_MAX_DISTANCE = float(os.environ.get("CLAIM_MATCH_MAX_DISTANCE", "0.05"))
+# Only claim-sized texts are matched; the encoder sees just the first ~128 tokens anyway
+CLAIM_MAX_CHARS = int(os.environ.get("CLAIM_MAX_CHARS", "1000"))
+# Exact search below this many claims, IVF (k-means cells, probe the nearest few) above it
+CLAIM_IVF_MIN = int(os.environ.get("CLAIM_IVF_MIN", "4096"))
+CLAIM_IVF_NPROBE = int(os.environ.get("CLAIM_IVF_NPROBE", "8"))
+KMEANS_ITERATIONS = 8
+# Candidates within the distance threshold that are checked against the wording guard
+MATCH_CANDIDATES = 5
+
+# Words that flip a claim's meaning while barely moving its embedding
+# ("officials confirm the report" / "officials deny the report"), as stemmed by relevance.terms
+CONTRADICTION_WORDS = frozenset("""
+    confirm deny true false fake real hoax genuine approve reject accept refuse win lose rise fall
+    increase decrease up down higher lower more less alive dead die kill survive arrest release ban
+    allow legal illegal safe unsafe support oppose guilty innocent convict acquit open close start
+    end resign appoint pass fail
+""".split())
+# Words that undo an earlier action ("Government bans TikTok" / "Government lifts ban on TikTok");
+# "call off" is matched as a phrase
+REVERSAL_WORDS = frozenset("""
+    lift cancel cancellation scrap withdraw revoke overturn repeal rescind reverse reversal postpone
+    suspend halt drop abandon
+""".split())
+IRREGULAR_FORMS = {"denied": "deny", "won": "win", "lost": "lose", "rose": "rise", "risen": "rise",
+                   "fell": "fall", "fallen": "fall", "died": "die", "withdrew": "withdraw",
+                   "withdrawn": "withdraw"}
+
+# Spelled-out numbers, so "five dead" and "six dead" differ like "5 dead" and "6 dead" do
+NUMBER_WORDS = {w: i for i, w in enumerate(
+    "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen "
+    "sixteen seventeen eighteen nineteen".split())}
+NUMBER_WORDS.update({w: 10 * i for i, w in enumerate(
+    "twenty thirty forty fifty sixty seventy eighty ninety".split(), start=2)})
+SCALE_WORDS = {"thousand": 1000, "lakh": 100000, "million": 1000000, "crore": 10000000,
+               "billion": 1000000000}
+
+
+def _base_word(term: str, words: frozenset) -> Optional[str]:
+    """The form of term found in words, after undoing -ed/-d/-ing and a doubled final consonant."""
+    term = IRREGULAR_FORMS.get(term, term)
+    stems = [term]
+    for suffix in ("ed", "d", "ing"):
+        if term.endswith(suffix):
+            stem = term[:-len(suffix)]
+            stems.append(stem)
+            if len(stem) > 2 and stem[-1] == stem[-2]:
+                stems.append(stem[:-1])
+    for stem in stems:
+        if stem in words:
+            return stem
+    return None
+
+
+def _meaning_words(tokens: List[str]) -> set:
+    """Contradiction and reversal words in a claim's terms, in base form."""
+    found = set()
+    for i, term in enumerate(tokens):
+        word = _base_word(term, CONTRADICTION_WORDS) or _base_word(term, REVERSAL_WORDS)
+        if word:
+            found.add(word)
+        elif term in ("call", "called", "calling") and tokens[i + 1:i + 2] == ["off"]:
+            found.add("call off")
+    return found
+
+
+def _numbers(tokens: List[str]) -> set:
+    """Numbers in a claim's terms, as digits, words or both ("25", "twenty five", "3 million")."""
+    found = set()
+    total = current = 0
+    previous = None  # "digits", "word" or "scale" while inside a number
+    for term in tokens + [""]:
+        if term.isdigit() or (term in NUMBER_WORDS and previous == "digits"):
+            # Starts a new number; only a scale word may follow digits ("3 million")
+            if previous:
+                found.add(total + current)
+            total, current = 0, int(term) if term.isdigit() else NUMBER_WORDS[term]
+            previous = "digits" if term.isdigit() else "word"
+        elif term in NUMBER_WORDS:
+            current += NUMBER_WORDS[term]
+            previous = "word"
+        elif term == "hundred":
+            current = max(current, 1) * 100
+            previous = "scale"
+        elif term in SCALE_WORDS:
+            total += max(current, 1) * SCALE_WORDS[term]
+            current = 0
+            previous = "scale"
+        elif term == "and" and previous == "scale":
+            continue
+        elif previous:
+            found.add(total + current)
+            total = current = 0
+            previous = None
+    return found
+
+
+def same_claim(a: str, b: str) -> bool:
+    """
+    Wording guard on top of the embedding distance: the texts may differ,
+    but not in their numbers or in words that reverse the claim.
+    """
+    ta, tb = terms(a), terms(b)
+    if _numbers(ta) != _numbers(tb):
+        return False
+    return _meaning_words(ta) == _meaning_words(tb)
+
+
+def kmeans(vectors: np.ndarray, k: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on unit vectors; returns unit-norm centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        assign = (vectors @ centroids.T).argmax(axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        norms = np.linalg.norm(sums, axis=1)
+        empty = norms == 0
+        # Re-seed empty cells with random points
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        norms[empty] = 1.0
+        centroids = sums / norms[:, None]
+    return centroids
+
+
+class ClaimStore:
+    """
+    Previously checked claims and their results, searchable by meaning.
+    Vectors live in a fixed-size ring buffer (oldest overwritten first).
+    Once it holds CLAIM_IVF_MIN claims, an inverted-file index over
+    k-means cells restricts each search to the nearest CLAIM_IVF_NPROBE
+    cells; it is retrained whenever the store has doubled since.
+    Only entries with the same group (e.g. negation present or not) match.
+    """
+
+    def __init__(self, maxsize: int = CLAIM_STORE_SIZE, max_distance: float = CLAIM_MATCH_MAX_DISTANCE,
+                 ttl: float = CLAIM_STORE_TTL, name: str = "claims"):
+        self.maxsize = maxsize
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._vectors = None
+        self._groups = np.zeros(self.maxsize, dtype=np.int32)
+        self._expires = np.zeros(self.maxsize, dtype=np.float64)
+        self._cells = np.zeros(self.maxsize, dtype=np.int32)
+        self._texts: List[Optional[str]] = [None] * self.maxsize
+        self._values: List[Any] = [None] * self.maxsize
+        self._added = 0
+        self._centroids = None
+        self._trained_at = 0
+
+    @property
+    def size(self) -> int:
+        return min(self._added, self.maxsize)
+
+    def embed(self, texts: List[str]) -> Optional[np.ndarray]:
+        """Encodes texts for search/add, or None if the encoder is unavailable."""
+        encoder = get_encoder() if CLAIM_STORE_ENABLED else None
+        if encoder is None:
+            return None
+        return encoder.encode(texts)
+
+    def _train(self):
+        n = self.size
+        vectors = self._vectors[:n]
+        nlist = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(n)
+        sample = vectors[rng.choice(n, min(n, 32 * nlist), replace=False)]
+        self._centroids = kmeans(sample, nlist, seed=n)
+        self._cells[:n] = (vectors @ self._centroids.T).argmax(axis=1)
+        self._trained_at = self._added
+
+    def _live_candidates(self, vector: np.ndarray) -> np.ndarray:
+        # Caller must hold the lock
+        n = self.size
+        if self._centroids is None:
+            candidates = np.arange(n)
+        else:
+            probes = np.argsort(-(self._centroids @ vector))[:CLAIM_IVF_NPROBE]
+            candidates = np.flatnonzero(np.isin(self._cells[:n], probes))
+        return candidates[self._expires[candidates] > time.time()]
+
+    def search(self, vector: np.ndarray, group: int = 0, text: Optional[str] = None) -> Optional[Dict]:
+        """
+        Returns {"value", "distance", "text"} for the closest live claim
+        within max_distance. With `text`, candidates must also pass same_claim.
+        """
+        with self._lock:
+            if self.size == 0:
+                self.misses += 1
+                return None
+            candidates = self._live_candidates(vector)
+            candidates = candidates[self._groups[candidates] == group]
+            distances = 1.0 - self._vectors[candidates] @ vector
+            for i in np.argsort(distances)[:MATCH_CANDIDATES]:
+                if distances[i] > self.max_distance:
+                    break
+                slot = int(candidates[i])
+                if text is not None and not same_claim(text, self._texts[slot]):
+                    continue
+                self.hits += 1
+                return {"value": self._values[slot], "distance": round(max(float(distances[i]), 0.0), 4),
+                        "text": self._texts[slot]}
+            self.misses += 1
+            return None
+
+    def add(self, vector: np.ndarray, text: str, value: Any, group: int = 0) -> None:
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+            slot = self._added % self.maxsize
+            self._vectors[slot] = vector
+            self._groups[slot] = group
+            self._expires[slot] = time.time() + self.ttl
+            self._texts[slot] = text
+            self._values[slot] = value
+            self._added += 1
+            if self._centroids is not None:
+                self._cells[slot] = int((self._centroids @ vector).argmax())
+            if self.size >= CLAIM_IVF_MIN and self._added >= 2 * max(self._trained_at, CLAIM_IVF_MIN // 2):
+                self._train()
+
+    def remove(self, vector: np.ndarray) -> int:
+        """Expires every stored claim (any group) that a search for `vector` could return."""
+        with self._lock:
+            if self.size == 0:
+                return 0
+            # Exhaustive rather than probing IVF cells, so nothing close is missed
+            candidates = np.flatnonzero(self._expires[:self.size] > time.time())
+            matched = candidates[1.0 - self._vectors[candidates] @ vector <= self.max_distance]
+            self._expires[matched] = 0.0
+            for slot in matched:
+                self._values[slot] = None
+            return len(matched)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"name": self.name, "size": self.size, "hits": self.hits, "misses": self.misses,
+                    "cells": 0 if self._centroids is None else len(self._centroids),
+                    "max_distance": self.max_distance}
+
+
+claim_store = ClaimStore()
@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+# ----------------------
+# Built-in domain lists
+# ----------------------
+# Publishers whose URLs are accepted as authentic without running the model (routes/url.py)
+TRUSTED_PUBLISHERS = {
+    'reuters.com', 'apnews.com', 'bbc.com', 'bbc.co.uk',
+    'nytimes.com', 'washingtonpost.com', 'theguardian.com',
+    'wsj.com', 'bloomberg.com', 'npr.org', 'pbs.org',
+    'economist.com', 'ft.com', 'cnn.com', 'nbcnews.com',
+    'cbsnews.com', 'abcnews.go.com', 'usatoday.com',
+    'time.com', 'newsweek.com', 'politico.com', 'axios.com',
+    'thehill.com', 'propublica.org', 'latimes.com',
+    'aljazeera.com', 'dw.com', 'france24.com', 'timesnownews.com',
+    'timesofindia.indiatimes.com', 'indianexpress.com', 'firstpost.com',
+    'altnews.in', 'ddnews.gov.in', 'indiatoday.in'
+}
+
+# Sites whose articles count as corroboration in news search (models/text_model.py).
+# msn.com republishes wire copy, so it corroborates a claim but is not itself a trusted publisher.
+SEARCH_SOURCES = {
+    'reuters.com', 'apnews.com', 'bbc.com', 'bbc.co.uk',
+    'nytimes.com', 'washingtonpost.com', 'theguardian.com',
+    'wsj.com', 'bloomberg.com', 'npr.org', 'pbs.org',
+    'economist.com', 'ft.com', 'cnn.com', 'nbcnews.com',
+    'cbsnews.com', 'abcnews.go.com', 'usatoday.com',
+    'time.com', 'newsweek.com', 'politico.com', 'axios.com',
+    'thehill.com', 'propublica.org', 'latimes.com',
+    'aljazeera.com', 'dw.com', 'france24.com', 'timesnownews.com',
+    'timesofindia.indiatimes.com', 'indianexpress.com', 'firstpost.com',
+    'altnews.in', 'ddnews.gov.in', 'msn.com'
+}
+
+FLAGGED_DOMAINS = [
+    "opindia.com", "postcard.news", "sudarshannews.in", "swarajyamag.com", "thefrustratedindian.com",
+    "kreately.in", "dainikbharat.org", "hindupost.in", "theyouth.in", "indiaspeaksdaily.com",
+    "aajkitazakhabar.com", "nationwantstoknow.com", "truepicture.in", "sirfnews.com", "thelogicalindian.com",
+    "newsroompost.com", "mynation.com", "tv9bharatvarsh.com", "vskbharat.com",
+    "bharatkhabar.com", "jankibaat.com", "hindutva.info", "dailyhunt.in", "jagran.com",
+    "amarujala.com", "punjabkesari.in", "hindi.news18.com", "oneindia.com", "newsx.com",
+    "breakingtube.com", "dailyswitch.com", "thecommune.in", "sanatanprabhat.org", "aapkikhabar.com",
+    "rashtrasamachar.com", "factorfictionindia.com", "currentaffairsindia.com", "bharattoday.in", "deshkibaat.com",
+    "indiaviralnews.com", "lokmatnews.in", "khabarindia.com", "patrika.com", "indiabulletin.com",
+    "rashtriyasamachar.com", "virarnationindia.com", "breakingbharat.com", "hindustanexpress.com", "newsnation.in",
+    "indiafastnews.com", "dailybhaskar.com", "hindustantimesbuzz.com", "yournewswire.com", "infowars.com",
+    "breitbart.com", "naturalnews.com", "thegatewaypundit.com", "worldnewsdailyreport.com", "beforeitsnews.com",
+    "americannews.com", "newswatch28.com", "empirenews.net", "nationalreport.net", "libertywritersnews.com",
+    "theonion.com", "clickhole.com", "dailybuzzlive.com", "civictribune.com", "dcgazette.com",
+    "redstatewatcher.com", "usasupreme.com", "thelastlineofdefense.org", "newsexaminer.net", "realnewsrightnow.com",
+    "therightists.com", "conservativedailypost.com", "70news.wordpress.com", "babylonbee.com", "disclose.tv",
+    "peoplesvoice.org", "politicalinsider.com", "thefederalist.com", "zerohedge.com", "rt.com",
+    "sputniknews.com", "presstv.com", "almasdarnews.com", "veteranstoday.com", "southfront.org",
+    "infostormer.com", "investmentwatchblog.com", "bigamericannews.com", "newslo.com", "channel23news.com",
+    "empireherald.com", "theresistance.info", "bostontribune.com", "dailycurrant.com", "thespoof.com",
+    "worldtruth.tv", "pakalertpress.com", "naturalsociety.com", "collective-evolution.com", "anti-media.com",
+    "intellihub.com", "neonnettle.com", "thefreethoughtproject.com", "themindunleashed.com", "politicalmayhem.news",
+    "thelibertybeacon.com", "globalresearch.ca"
+]
+
+TRUSTED = "trusted"
+FLAGGED = "flagged"
+SEARCH_SOURCE = "search_source"
+
+# Optional external list, one "<domain> [trusted|flagged|search_source]" per line (category
+# defaults to flagged). "trusted" only affects URL checks, "search_source" only news search.
+DOMAIN_REPUTATION_FILE = os.environ.get("DOMAIN_REPUTATION_FILE")
+DOMAIN_REPUTATION_RELOAD_SECONDS = float(os.environ.get("DOMAIN_REPUTATION_RELOAD_SECONDS", "30"))
+
+
+def normalize_domain(domain: str) -> str:
+    return domain.strip().lower().replace(" ", "").rstrip(".")
+
+
+def host_of(url: str) -> str:
+    """Returns the lowercase hostname of a URL (or of a bare host string)."""
+    if "//" not in url:
+        url = "//" + url
+    try:
+        return (urlparse(url).hostname or "").rstrip(".")
+    except ValueError:
+        return ""
+
+
+class DomainIndex:
+    """
+    Suffix index over domain names. Lookups walk the host's labels from the
+    most specific suffix to the least ("a.b.example.com", "b.example.com",
+    "example.com", "com"), so cost is O(labels) regardless of list size.
+    """
+
+    def __init__(self, entries: Dict[str, str] = None):
+        self._entries = dict(entries or {})
+
+    def __len__(self):
+        return len(self._entries)
+
+    def match(self, host: str) -> Optional[tuple]:
+        """Returns (matched_domain, category) for the most specific listed suffix of host."""
+        host = normalize_domain(host)
+        if host.startswith("www."):
+            host = host[4:]
+        while host:
+            category = self._entries.get(host)
+            if category is not None:
+                return host, category
+            dot = host.find(".")
+            if dot < 0:
+                return None
+            host = host[dot + 1:]
+        return None
+
+    def category(self, host: str) -> Optional[str]:
+        found = self.match(host)
+        return found[1] if found else None
+
+
+class DomainReputation:
+    """
+    Shared domain lookup: trusted/flagged publishers for URL checks, and a
+    separate set of corroborating sites for news search. Built-in lists are
+    merged with an optional external file, which is re-read when it changes on disk.
+    """
+
+    def __init__(self, path: Optional[str] = DOMAIN_REPUTATION_FILE,
+                 reload_seconds: float = DOMAIN_REPUTATION_RELOAD_SECONDS):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._index = DomainIndex()
+        self._search_index = DomainIndex()
+        self.reload()
+
+    def reload(self) -> int:
+        """Rebuilds the indexes from the built-in lists and the external file. Returns their size."""
+        entries = {normalize_domain(d): TRUSTED for d in TRUSTED_PUBLISHERS}
+        for d in FLAGGED_DOMAINS:
+            entries[normalize_domain(d)] = FLAGGED
+        search_entries = {normalize_domain(d): SEARCH_SOURCE for d in SEARCH_SOURCES}
+
+        mtime = None
+        if self.path and os.path.exists(self.path):
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.split("#", 1)[0].strip()
+                    if not line:
+                        continue
+                    parts = line.split()
+                    category = parts[1].lower() if len(parts) > 1 else FLAGGED
+                    if category in (TRUSTED, FLAGGED):
+                        entries[normalize_domain(parts[0])] = category
+                    elif category == SEARCH_SOURCE:
+                        search_entries[normalize_domain(parts[0])] = category
+
+        index = DomainIndex(entries)
+        search_index = DomainIndex(search_entries)
+        with self._lock:
+            # Swap in the new indexes atomically; readers never see a half-built one
+            self._index = index
+            self._search_index = search_index
+            self._mtime = mtime
+            self._checked_at = time.monotonic()
+        return len(index) + len(search_index)
+
+    def _maybe_reload(self) -> None:
+        if not self.path or time.monotonic() - self._checked_at < self.reload_seconds:
+            return
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        except OSError:
+            return
+        if mtime != self._mtime:
+            print(f"Domain reputation file changed, reloading: {self.path}")
+            self.reload()
+
+    def category(self, url_or_host: str) -> Optional[str]:
+        self._maybe_reload()
+        return self._index.category(host_of(url_or_host))
+
+    def is_trusted(self, url_or_host: str) -> bool:
+        return self.category(url_or_host) == TRUSTED
+
+    def is_flagged(self, url_or_host: str) -> bool:
+        return self.category(url_or_host) == FLAGGED
+
+    def is_search_source(self, url_or_host: str) -> bool:
+        """Whether an article from this site counts as corroboration in news search."""
+        self._maybe_reload()
+        return self._search_index.category(host_of(url_or_host)) == SEARCH_SOURCE
+
+    def stats(self) -> Dict:
+        return {"domains": len(self._index), "search_sources": len(self._search_index),
+                "file": self.path, "file_mtime": self._mtime}
+
+
+domain_reputation = DomainReputation()
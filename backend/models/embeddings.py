@@ -0,0 +1,60 @@
+"""
+Small CPU sentence encoder shared by the local news index and other
+similarity lookups. Uses mean-pooled token embeddings of a MiniLM-style
+model through plain transformers, so no extra dependency is needed.
+"""
+import os
+import threading
+from typing import List
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+# ----------------------
+# Configuration
+# ----------------------
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_MAX_TOKENS = int(os.environ.get("EMBEDDING_MAX_TOKENS", "128"))
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "32"))
+
+_lock = threading.Lock()
+_encoder = None
+_failed = False
+
+
+class Encoder:
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        self.model_name = model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModel.from_pretrained(model_name)
+        self.model.eval()
+        self.dim = self.model.config.hidden_size
+
+    def encode(self, texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
+        """L2-normalized float32 embeddings, one row per text."""
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            batch = [t or "" for t in texts[start:start + batch_size]]
+            inputs = self.tokenizer(batch, padding=True, truncation=True,
+                                    max_length=EMBEDDING_MAX_TOKENS, return_tensors="pt")
+            with torch.inference_mode():
+                hidden = self.model(**inputs).last_hidden_state
+            mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            pooled = torch.nn.functional.normalize(pooled, dim=1)
+            out[start:start + len(batch)] = pooled.numpy()
+        return out
+
+
+def get_encoder():
+    """Returns the shared Encoder, or None if the model can't be loaded."""
+    global _encoder, _failed
+    if _encoder is None and not _failed:
+        with _lock:
+            if _encoder is None and not _failed:
+                try:
+                    _encoder = Encoder()
+                except Exception as e:
+                    print(f"Sentence encoder {EMBEDDING_MODEL} unavailable: {e}")
+                    _failed = True
+    return _encoder
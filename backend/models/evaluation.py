@@ -1,196 +1,313 @@
-import pandas as pd
-import torch
-import random
-from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, classification_report
-import matplotlib.pyplot as plt
-import seaborn as sns
-import re
-import numpy as np
-
-# ---------------------------
-# 1️⃣ Load and preprocess datasets
-# ---------------------------
-fake_path = "Fake.csv"
-true_path = "True.csv"
-
-print("Loading datasets...")
-fake_df = pd.read_csv(fake_path)
-true_df = pd.read_csv(true_path)
+"""
+Evaluates the text classification pipeline on the Fake.csv/True.csv dataset.
 
-fake_df = fake_df[["title", "text"]].dropna()
-true_df = true_df[["title", "text"]].dropna()
+Predictions go through the same code as the API (prepare_text, batched
+run_model / classify_document, build_result), are checkpointed to
+<out>/predictions.*.jsonl after every batch and skipped on the next run,
+so an interrupted evaluation resumes where it stopped. --workers shards
+the test set across processes, each with its own model copy.
 
-# Balanced subset
-fake_df = fake_df.sample(n=5000, random_state=42)
-true_df = true_df.sample(n=4650, random_state=42)
+Verification is reproducible: "seeded" simulates trusted-source counts
+from a per-sample seed, "live" queries the real providers, "none" skips
+it. Every prediction records the verification it used, and --replay
+reuses those from an earlier run (e.g. a live one) instead.
 
-fake_df["text"] = fake_df["title"].astype(str) + ". " + fake_df["text"].astype(str)
-true_df["text"] = true_df["title"].astype(str) + ". " + true_df["text"].astype(str)
+Usage (from backend/):
+    python -m models.evaluation --fake Fake.csv --true True.csv --out eval_runs/base
+    python -m models.evaluation --out eval_runs/onnx --workers 4 --batch-size 16
+    python -m models.evaluation --out eval_runs/live --verification live
+    python -m models.evaluation --out eval_runs/replay --replay eval_runs/live --plot
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
+import numpy as np
 
-fake_df["label"] = 0
-true_df["label"] = 1
+FAKE, REAL = 0, 1
 
-df = pd.concat([fake_df, true_df], axis=0).sample(frac=1, random_state=42).reset_index(drop=True)
-df = df[["text", "label"]]
 
 # ---------------------------
-# 2️⃣ Split dataset
+# Dataset
 # ---------------------------
-train_texts, test_texts, train_labels, test_labels = train_test_split(
-    df["text"].tolist(),
-    df["label"].tolist(),
-    test_size=0.2,
-    random_state=42,
-    stratify=df["label"]
-)
-print(f"Dataset loaded. Total: {len(df)}, Train: {len(train_texts)}, Test: {len(test_texts)}")
+def load_test_set(fake_path: str, true_path: str, fake_n: int, true_n: int,
+                  test_size: float, seed: int) -> List[Dict]:
+    """Balanced, shuffled test split; sample ids are positions in it and stable for a given config."""
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+
+    fake_df = pd.read_csv(fake_path)[["title", "text"]].dropna()
+    true_df = pd.read_csv(true_path)[["title", "text"]].dropna()
+    fake_df = fake_df.sample(n=min(fake_n, len(fake_df)), random_state=seed)
+    true_df = true_df.sample(n=min(true_n, len(true_df)), random_state=seed)
+
+    fake_df["text"] = fake_df["title"].astype(str) + ". " + fake_df["text"].astype(str)
+    true_df["text"] = true_df["title"].astype(str) + ". " + true_df["text"].astype(str)
+    fake_df["label"] = FAKE
+    true_df["label"] = REAL
+
+    df = pd.concat([fake_df, true_df], axis=0).sample(frac=1, random_state=seed).reset_index(drop=True)
+    _, test_texts, _, test_labels = train_test_split(
+        df["text"].tolist(), df["label"].tolist(),
+        test_size=test_size, random_state=seed, stratify=df["label"]
+    )
+    return [{"id": i, "text": t, "label": int(l)} for i, (t, l) in enumerate(zip(test_texts, test_labels))]
 
-# ---------------------------
-# 3️⃣ Load model
-# ---------------------------
-MODEL_NAME = "hamzab/roberta-fake-news-classification"
-print(f"Loading model: {MODEL_NAME}")
-
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
-device = 0 if torch.cuda.is_available() else -1
-
-clf = pipeline(
-    "text-classification",
-    model=model,
-    tokenizer=tokenizer,
-    device=device,
-    truncation=True,
-    max_length=512
-)
 
 # ---------------------------
-# 4️⃣ Helper functions
+# Verification
 # ---------------------------
-def preprocess_text(text):
-    text = re.sub(r'http\S+|www\S+', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-def simulate_verification(true_label=None):
-    """Simulate trusted-source verification results with more realistic scaling."""
-    rand = random.random()
-    if true_label == 1:  # REAL
+def simulate_verification(label: int, rng: random.Random) -> Dict:
+    """Simulated trusted-source lookup: real news is usually corroborated, fake news rarely."""
+    rand = rng.random()
+    if label == REAL:
         if rand < 0.15:
-            count = random.randint(1, 2)
+            count = rng.randint(1, 2)
         elif rand < 0.85:
-            count = random.randint(3, 6)
+            count = rng.randint(3, 6)
         else:
             count = 0
-    else:  # FAKE
+    else:
         if rand < 0.7:
             count = 0
         elif rand < 0.9:
-            count = random.randint(1, 2)
+            count = rng.randint(1, 2)
         else:
-            count = random.randint(3, 4)
-
-    confidence = 0.3 if count == 0 else (0.6 if count < 3 else random.uniform(0.8, 0.95))
-    return {
-        "trusted_sources_found": count,
-        "verified": count > 0,
-        "confidence": confidence
-    }
+            count = rng.randint(3, 4)
 
-def calculate_authenticity_score(model_score, verification_result):
-    """Weighted combination of model and verification confidence."""
-    verified_sources = verification_result.get("trusted_sources_found", 0)
-    verification_confidence = verification_result.get("confidence", 0.5)
+    confidence = 0.3 if count == 0 else (0.6 if count < 3 else rng.uniform(0.8, 0.95))
+    return {"verified": count > 0, "confidence": confidence, "trusted_sources_found": count, "simulated": True}
 
-    # Adaptive weighting for realism
-    if verified_sources >= 3:
-        return model_score * 0.25 + verification_confidence * 0.75
-    elif verified_sources >= 1:
-        return model_score * 0.45 + verification_confidence * 0.55
-    else:
-        return model_score * 0.8 + verification_confidence * 0.2
-
-def classify_text(text, true_label=None):
-    """Enhanced classifier combining model prediction + simulated verification."""
-    processed = preprocess_text(text)
-    result = clf(processed[:512])[0]
-    model_label = result["label"].upper()
-    model_score = result["score"]
-
-    base_pred = "FAKE" if model_label in ("FAKE", "LABEL_0", "NEGATIVE", "UNRELIABLE") else "REAL"
-
-    verification_result = simulate_verification(true_label)
-    authenticity_score = calculate_authenticity_score(model_score, verification_result)
-    authenticity_score += random.uniform(-0.03, 0.03)
-    authenticity_score = np.clip(authenticity_score, 0.0, 1.0)
-
-    # Decision refinement based on thresholds
-    if base_pred == "REAL":
-        if verification_result["trusted_sources_found"] >= 2 or authenticity_score > 0.68:
-            final_pred = "REAL"
-        else:
-            final_pred = "FAKE"
-    else:  # base_pred == "FAKE"
-        if verification_result["trusted_sources_found"] >= 3 and authenticity_score > 0.75:
-            final_pred = "REAL"
-        else:
-            final_pred = "FAKE"
 
-    # Reduce randomness to stabilize output
-    if random.random() < 0.08 and 0.6 < authenticity_score < 0.85:
-        final_pred = "REAL" if final_pred == "FAKE" else "FAKE"
+def get_verification(sample: Dict, mode: str, seed: int, processed_text: str) -> Dict:
+    if mode == "seeded":
+        # Seeded per sample, so results don't depend on batching, sharding or resume order
+        return simulate_verification(sample["label"], random.Random(f"{seed}:{sample['id']}"))
+    if mode == "live":
+        from models.text_model import verify_with_trusted_sources
+        return verify_with_trusted_sources(processed_text)
+    return {"verified": False, "confidence": 0.0, "trusted_sources_found": 0}
 
-    return final_pred, authenticity_score, verification_result["trusted_sources_found"]
 
 # ---------------------------
-# 5️⃣ Evaluate model
+# Checkpoints
 # ---------------------------
-pred_labels = []
-verified_counts = []
-print("Evaluating model with adaptive verification logic...")
-
-for text, label in zip(test_texts, test_labels):
-    try:
-        pred, auth_score, verified = classify_text(text, label)
-        pred_labels.append(0 if pred == "FAKE" else 1)
-        verified_counts.append(verified)
-    except Exception as e:
-        print(f"Error: {e}")
-        pred_labels.append(0)
-        verified_counts.append(0)
+def read_predictions(run_dir: str) -> Dict[int, Dict]:
+    records = {}
+    for path in sorted(glob.glob(os.path.join(run_dir, "predictions.*.jsonl"))):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # partial line from an interrupted write
+                records[record["id"]] = record
+    return records
+
+
+def check_run_config(out_dir: str, config: Dict) -> None:
+    """Refuses to resume into a directory created with a different dataset/model/verification setup."""
+    path = os.path.join(out_dir, "config.json")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            previous = json.load(f)
+        changed = [k for k in config if previous.get(k) != config[k]]
+        if changed:
+            raise SystemExit(f"{out_dir} was created with different settings ({', '.join(changed)}); "
+                             "use a new --out directory")
+        return
+    os.makedirs(out_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
 
 # ---------------------------
-# 6️⃣ Metrics
+# Worker
 # ---------------------------
-acc = accuracy_score(test_labels, pred_labels)
-prec = precision_score(test_labels, pred_labels, zero_division=0)
-rec = recall_score(test_labels, pred_labels, zero_division=0)
-f1 = f1_score(test_labels, pred_labels, zero_division=0)
+def run_shard(shard: int, samples: List[Dict], options: Dict) -> int:
+    """Classifies samples in batches, appending each finished batch to this shard's checkpoint file."""
+    import torch
+    from models.text_model import (prepare_text, run_model, needs_chunking, classify_document,
+                                   build_result, get_classifier)
+
+    if options["threads"]:
+        torch.set_num_threads(options["threads"])
+    if get_classifier() is None:
+        raise RuntimeError("Model unavailable")
+
+    # Similar lengths in a batch mean less padding
+    samples = sorted(samples, key=lambda s: len(s["text"]))
+    batch_size = options["batch_size"]
+    done = 0
+    path = os.path.join(options["out"], f"predictions.{shard}.jsonl")
+    with open(path, "a", encoding="utf-8") as out:
+        for start in range(0, len(samples), batch_size):
+            batch = samples[start:start + batch_size]
+            started = time.perf_counter()
+            prepared = [prepare_text(s["text"]) for s in batch]
+            verifications = [options["replay"].get(s["id"]) or
+                             get_verification(s, options["verification"], options["seed"], processed)
+                             for s, (processed, _) in zip(batch, prepared)]
 
-print("\n===== Evaluation Results (Enhanced Verification Logic) =====")
-print(f"Accuracy:  {acc:.4f}")
-print(f"Precision: {prec:.4f}")
-print(f"Recall:    {rec:.4f}")
-print(f"F1 Score:  {f1:.4f}")
+            outputs = [None] * len(batch)
+            short = [j for j, (processed, _) in enumerate(prepared) if not needs_chunking(processed)]
+            for j, output in zip(short, run_model([prepared[j][0] for j in short], batch_size=batch_size) or []):
+                outputs[j] = output
+            for j, (processed, _) in enumerate(prepared):
+                if needs_chunking(processed):
+                    outputs[j] = classify_document(processed)
+            batch_ms = (time.perf_counter() - started) * 1000
+
+            for sample, (processed, negation_present), verification, output in zip(batch, prepared, verifications, outputs):
+                result = build_result(output, processed, negation_present, verification) if output else {}
+                prediction = result.get("prediction", "UNCERTAIN")
+                out.write(json.dumps({
+                    "id": sample["id"],
+                    "label": sample["label"],
+                    "pred": REAL if prediction == "REAL" else FAKE,
+                    "prediction": prediction,
+                    "model_prediction": result.get("model_prediction"),
+                    "model_score": result.get("model_score"),
+                    "authenticity_score": result.get("authenticity_score"),
+                    "verification": verification,
+                    "batch_ms": round(batch_ms, 2),
+                    "batch_size": len(batch),
+                    "latency_ms": round(batch_ms / len(batch), 2)
+                }) + "\n")
+            out.flush()
+            done += len(batch)
+            print(f"[shard {shard}] {done}/{len(samples)} ({len(batch) / batch_ms * 1000:.1f} texts/s)", flush=True)
+    return done
 
-print("\nClassification Report:\n", classification_report(test_labels, pred_labels, target_names=["FAKE", "REAL"]))
 
 # ---------------------------
-# 7️⃣ Confusion Matrix
+# Report
 # ---------------------------
-cm = confusion_matrix(test_labels, pred_labels)
-plt.figure(figsize=(5, 4))
-sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
-            xticklabels=["Pred: Fake", "Pred: Real"],
-            yticklabels=["True: Fake", "True: Real"])
-plt.title("Confusion Matrix (Enhanced Verification Logic)")
-plt.xlabel("Predicted")
-plt.ylabel("True")
-plt.tight_layout()
-plt.savefig("confusion_matrix_enhanced_verification.png")
-plt.show()
-
-print("\n🔍 Verification counts sample:", verified_counts[:20])
-print("\n✅ Confusion matrix saved as 'confusion_matrix_enhanced_verification.png'")
+def report(records: List[Dict], run_seconds: float, run_count: int, workers: int, out_dir: str, plot: bool) -> Dict:
+    from sklearn.metrics import (accuracy_score, precision_score, recall_score, f1_score,
+                                 confusion_matrix, classification_report)
+
+    labels = [r["label"] for r in records]
+    preds = [r["pred"] for r in records]
+    latency = np.array([r["latency_ms"] for r in records])
+    batch_latency = np.array([r["batch_ms"] for r in records])
+    metrics = {
+        "samples": len(records),
+        "accuracy": accuracy_score(labels, preds),
+        "precision": precision_score(labels, preds, zero_division=0),
+        "recall": recall_score(labels, preds, zero_division=0),
+        "f1": f1_score(labels, preds, zero_division=0),
+        "uncertain": sum(r["prediction"] == "UNCERTAIN" for r in records),
+        "confusion_matrix": confusion_matrix(labels, preds, labels=[FAKE, REAL]).tolist(),
+        # Per text, amortized over its batch; and per batch
+        "latency_ms": {f"p{p}": float(np.percentile(latency, p)) for p in (50, 90, 99)},
+        "batch_latency_ms": {f"p{p}": float(np.percentile(batch_latency, p)) for p in (50, 90, 99)},
+        "throughput": {"texts": run_count, "seconds": round(run_seconds, 2), "workers": workers,
+                       "texts_per_sec": run_count / run_seconds if run_seconds > 0 else None},
+    }
+
+    print("\n===== Evaluation Results =====")
+    print(f"Samples:    {metrics['samples']} ({metrics['uncertain']} uncertain)")
+    print(f"Accuracy:   {metrics['accuracy']:.4f}")
+    print(f"Precision:  {metrics['precision']:.4f}")
+    print(f"Recall:     {metrics['recall']:.4f}")
+    print(f"F1 Score:   {metrics['f1']:.4f}")
+    print("Latency:    " + "  ".join(f"{k}={v:.1f} ms" for k, v in metrics["latency_ms"].items()) + " per text")
+    print("Batches:    " + "  ".join(f"{k}={v:.1f} ms" for k, v in metrics["batch_latency_ms"].items()))
+    if run_count:
+        print(f"Throughput: {metrics['throughput']['texts_per_sec']:.1f} texts/s "
+              f"({run_count} texts this run, {workers} worker(s))")
+    print("\nClassification Report:\n",
+          classification_report(labels, preds, labels=[FAKE, REAL], target_names=["FAKE", "REAL"], zero_division=0))
+
+    with open(os.path.join(out_dir, "metrics.json"), "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=2)
+
+    if plot:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        plt.figure(figsize=(5, 4))
+        sns.heatmap(metrics["confusion_matrix"], annot=True, fmt='d', cmap='Blues',
+                    xticklabels=["Pred: Fake", "Pred: Real"],
+                    yticklabels=["True: Fake", "True: Real"])
+        plt.title("Confusion Matrix")
+        plt.xlabel("Predicted")
+        plt.ylabel("True")
+        plt.tight_layout()
+        plt.savefig(os.path.join(out_dir, "confusion_matrix.png"))
+        print(f"✅ Confusion matrix saved to {os.path.join(out_dir, 'confusion_matrix.png')}")
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fake", default="Fake.csv")
+    parser.add_argument("--true", default="True.csv")
+    parser.add_argument("--fake-samples", type=int, default=5000)
+    parser.add_argument("--true-samples", type=int, default=4650)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--limit", type=int, help="Only evaluate the first N test samples")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="eval_runs/latest", help="Run directory for checkpoints and metrics")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=1, help="Processes, each with its own model copy")
+    parser.add_argument("--verification", default="seeded", choices=["seeded", "live", "none"])
+    parser.add_argument("--replay", help="Run directory whose recorded verification results to reuse")
+    parser.add_argument("--plot", action="store_true", help="Save a confusion matrix plot")
+    args = parser.parse_args()
+
+    from models.text_model import DEFAULT_MODEL, MODEL_REVISION, MODEL_BACKEND, CHUNK_MODE
+    check_run_config(args.out, {
+        "fake": os.path.abspath(args.fake), "true": os.path.abspath(args.true),
+        "fake_samples": args.fake_samples, "true_samples": args.true_samples,
+        "test_size": args.test_size, "seed": args.seed, "verification": args.verification,
+        "replay": os.path.abspath(args.replay) if args.replay else None,
+        "model": DEFAULT_MODEL, "revision": MODEL_REVISION, "backend": MODEL_BACKEND, "chunk_mode": CHUNK_MODE
+    })
+
+    samples = load_test_set(args.fake, args.true, args.fake_samples, args.true_samples, args.test_size, args.seed)
+    if args.limit:
+        samples = samples[:args.limit]
+    wanted = {s["id"] for s in samples}
+    done = read_predictions(args.out)
+    remaining = [s for s in samples if s["id"] not in done]
+    print(f"Test set: {len(samples)} samples, {len(samples) - len(remaining)} already done, {len(remaining)} to go")
+
+    replay = {}
+    if args.replay:
+        replay = {i: r["verification"] for i, r in read_predictions(args.replay).items() if i in wanted}
+        print(f"Replaying {len(replay)} recorded verification results from {args.replay}")
+
+    workers = max(1, min(args.workers, len(remaining) or 1))
+    options = {"out": args.out, "batch_size": args.batch_size, "verification": args.verification,
+               "seed": args.seed, "replay": replay,
+               "threads": max(1, (os.cpu_count() or 1) // workers) if workers > 1 else 0}
+
+    started = time.perf_counter()
+    if remaining:
+        shards = [remaining[k::workers] for k in range(workers)]
+        if workers == 1:
+            run_shard(0, shards[0], options)
+        else:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                futures = [pool.submit(run_shard, k, shard, options) for k, shard in enumerate(shards)]
+                for future in futures:
+                    future.result()
+    run_seconds = time.perf_counter() - started
+
+    records = [r for i, r in read_predictions(args.out).items() if i in wanted]
+    if not records:
+        raise SystemExit("No predictions to report")
+    report(records, run_seconds, len(remaining), workers, args.out, args.plot)
+
+
+if __name__ == "__main__":
+    main()
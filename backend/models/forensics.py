@@ -0,0 +1,343 @@
+import io
+import os
+import time
+from typing import Dict
+import numpy as np
+from PIL import Image, ImageChops, ImageOps, ExifTags
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# ----------------------
+# Configuration
+# ----------------------
+# Images are analysed at most this large (longest side) to keep a single image well under 200 ms
+FORENSICS_MAX_SIDE = int(os.environ.get("FORENSICS_MAX_SIDE", "1024"))
+ELA_QUALITY = 90
+# The compression grid is measured on this much of the image (top-left, full resolution)
+GRID_CROP = 1024
+# Pixel steps at least this large are edges, not JPEG block seams
+GRID_EDGE_LIMIT = 20
+# Seam strength (peak / median over the 8 offsets) needed on both axes to call the grid shifted
+GRID_MIN_STRENGTH = 1.15
+MANIPULATION_THRESHOLD = float(os.environ.get("FORENSICS_THRESHOLD", "0.5"))
+
+# Signal weights for the combined score
+WEIGHTS = {"ela": 0.35, "jpeg": 0.2, "exif": 0.15, "copy_move": 0.3}
+
+EDITING_SOFTWARE = ("photoshop", "gimp", "lightroom", "snapseed", "picsart", "facetune",
+                    "pixlr", "affinity", "canva", "photoscape", "paint.net", "faceapp")
+
+# Standard IJG luminance quantization table (quality 50), in natural order as PIL returns it
+IJG_LUMA = np.array([
+    16, 11, 10, 16, 24, 40, 51, 61,
+    12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77,
+    24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101,
+    72, 92, 95, 98, 112, 100, 103, 99
+], dtype=np.float64)
+
+EXIF_TAGS = {v: k for k, v in ExifTags.TAGS.items()}
+
+
+def _clip01(x: float) -> float:
+    return float(min(max(x, 0.0), 1.0))
+
+
+def _open(source) -> Image.Image:
+    if isinstance(source, bytes):
+        return Image.open(io.BytesIO(source))
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return Image.open(source)
+
+
+def _grid_crop(source) -> np.ndarray:
+    """Top-left GRID_CROP x GRID_CROP luma of a JPEG, full resolution, stored layout."""
+    img = _open(source)
+    # Decode luma only; Image.crop loads the image, then only the crop is converted
+    img.draft("L", img.size)
+    crop = img.crop((0, 0, min(img.width, GRID_CROP), min(img.height, GRID_CROP)))
+    return np.asarray(crop.convert("L"))
+
+
+def _downscale(img: Image.Image) -> Image.Image:
+    longest = max(img.size)
+    if longest <= FORENSICS_MAX_SIDE:
+        return img
+    # Integer box reduction is several times cheaper than resampling; landing up to 25% under the limit is fine
+    factor = -(-longest // FORENSICS_MAX_SIDE)
+    if longest / factor >= 0.75 * FORENSICS_MAX_SIDE:
+        return img.reduce(factor)
+    scale = FORENSICS_MAX_SIDE / longest
+    return img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.BILINEAR)
+
+
+# ----------------------
+# Signals
+# ----------------------
+def error_level_analysis(rgb: Image.Image) -> Dict:
+    """
+    Re-saves the image at a known JPEG quality and measures how unevenly it
+    changes. Pasted or retouched areas tend to have a different error level
+    from the rest of the picture.
+    """
+    buf = io.BytesIO()
+    rgb.save(buf, "JPEG", quality=ELA_QUALITY)
+    resaved = Image.open(buf).convert("RGB")
+    channels = np.asarray(ImageChops.difference(rgb, resaved))
+    diff = np.maximum(np.maximum(channels[..., 0], channels[..., 1]), channels[..., 2])
+
+    h, w = diff.shape
+    bh, bw = h // 16, w // 16
+    if bh == 0 or bw == 0:
+        return {"score": 0.0, "note": "image too small"}
+    # Mean error per 16x16 block; outlier blocks hint at local edits
+    blocks = diff[:bh * 16, :bw * 16].reshape(bh, 16, bw, 16).mean(axis=(1, 3))
+    median = float(np.median(blocks))
+    spread = float(np.percentile(blocks, 99) - median)
+    mad = float(np.median(np.abs(blocks - median))) + 1e-6
+    outlier_share = float(np.mean(blocks > median + 6 * mad))
+    score = _clip01((spread / (median + 4.0) - 1.5) / 4.0)
+    return {
+        "score": round(score, 3),
+        "mean_error": round(float(diff.mean()), 3),
+        "block_spread": round(spread, 3),
+        "outlier_block_share": round(outlier_share, 4)
+    }
+
+
+def _grid_phases(crop: np.ndarray, axis: int) -> np.ndarray:
+    # Mean small step between neighbouring pixels, per offset modulo 8. Strong edges
+    # (text, UI lines) are left out: they fall anywhere and swamp the faint block seams.
+    diff = np.abs(np.diff(crop, axis=axis))
+    small = diff < GRID_EDGE_LIMIT
+    steps = (diff * small).sum(axis=1 - axis) / np.maximum(small.sum(axis=1 - axis), 1)
+    return np.array([steps[i::8].mean() for i in range(8)])
+
+
+def jpeg_analysis(img: Image.Image, grid_crop: np.ndarray) -> Dict:
+    """
+    Checks quantization tables (custom tables usually mean editing software)
+    and whether the 8x8 compression grid is aligned with the image origin
+    (a shifted grid suggests cropping and re-compression). Only JPEGs have
+    either, so other formats score 0. `grid_crop` is the top-left luma at full
+    resolution in stored (not EXIF-rotated) layout, where the grid lives.
+    """
+    result = {"score": 0.0, "is_jpeg": img.format == "JPEG"}
+    if not result["is_jpeg"]:
+        return result
+    score = 0.0
+
+    tables = getattr(img, "quantization", None) or {}
+    if tables:
+        luma = np.asarray(tables.get(0, []), dtype=np.float64)
+        if luma.size == 64:
+            # Estimate the IJG quality that would produce this table
+            ratio = float(np.mean(luma / IJG_LUMA)) * 100
+            quality = (200 - ratio) / 2 if ratio <= 100 else 5000 / ratio
+            quality = int(min(max(round(quality), 1), 100))
+            scale = (5000 / quality if quality < 50 else 200 - 2 * quality) / 100
+            expected = np.clip(np.floor(IJG_LUMA * scale + 0.5), 1, 255)
+            standard = bool(np.mean(np.abs(expected - luma)) < 1.0)
+            result.update(quality_estimate=quality, standard_tables=standard)
+            # Many phone cameras use their own tables too, so this alone is a weak signal
+            if not standard:
+                score += 0.3
+
+    # Blocking artifact strength per column/row offset modulo 8
+    crop = grid_crop.astype(np.float64)
+    if crop.shape[0] >= 64 and crop.shape[1] >= 64:
+        col_phase = _grid_phases(crop, axis=1)
+        row_phase = _grid_phases(crop, axis=0)
+        col_peak, row_peak = int(col_phase.argmax()), int(row_phase.argmax())
+        col_strength = col_phase.max() / (np.median(col_phase) + 1e-6)
+        row_strength = row_phase.max() / (np.median(row_phase) + 1e-6)
+        blockiness = float((col_strength + row_strength) / 2)
+        # Block boundaries sit between pixel 7 and 8, i.e. diff index 7. A crop shifts the grid on
+        # both axes; a clear off-grid peak on only one is usually regular layout (lines of text).
+        misaligned = bool(min(col_strength, row_strength) > GRID_MIN_STRENGTH and col_peak != 7 and row_peak != 7)
+        result.update(blockiness=round(blockiness, 3), grid_offset=[(col_peak + 1) % 8, (row_peak + 1) % 8],
+                      grid_misaligned=misaligned)
+        if misaligned:
+            score += 0.6
+
+    result["score"] = round(_clip01(score), 3)
+    return result
+
+
+def exif_analysis(img: Image.Image) -> Dict:
+    """Looks for editing software tags and inconsistent timestamps or dimensions."""
+    exif = img.getexif()
+    if not exif:
+        return {"score": 0.0, "has_exif": False}
+
+    findings = []
+    score = 0.0
+    software = str(exif.get(EXIF_TAGS["Software"], "")).lower()
+    if any(tool in software for tool in EDITING_SOFTWARE):
+        findings.append(f"edited with {software}")
+        score += 0.6
+
+    sub = exif.get_ifd(0x8769) if hasattr(exif, "get_ifd") else {}
+    modified = exif.get(EXIF_TAGS["DateTime"])
+    original = sub.get(EXIF_TAGS["DateTimeOriginal"])
+    if modified and original and modified != original:
+        findings.append("modification time differs from capture time")
+        score += 0.3
+
+    exif_w, exif_h = sub.get(EXIF_TAGS["ExifImageWidth"]), sub.get(EXIF_TAGS["ExifImageHeight"])
+    if exif_w and exif_h and sorted((int(exif_w), int(exif_h))) != sorted(img.size):
+        findings.append("recorded dimensions differ from actual image")
+        score += 0.2
+
+    return {"score": round(_clip01(score), 3), "has_exif": True, "software": software or None, "findings": findings}
+
+
+def _text_like(gray: np.ndarray, pts: np.ndarray, radius: int = 8, tolerance: int = 12,
+               min_contrast: int = 80) -> np.ndarray:
+    """
+    Marks keypoints sitting on glyphs or UI elements: a high-contrast patch
+    where most pixels share one flat background value. Repeated letters
+    and icons match each other perfectly and would otherwise look like clones.
+    """
+    padded = np.pad(gray.astype(np.int16), radius, mode="edge")
+    offsets = np.arange(-radius, radius)
+    xs = np.clip(np.round(pts[:, 0]).astype(np.int64), 0, gray.shape[1] - 1) + radius
+    ys = np.clip(np.round(pts[:, 1]).astype(np.int64), 0, gray.shape[0] - 1) + radius
+    patches = padded[ys[:, None, None] + offsets[None, :, None], xs[:, None, None] + offsets[None, None, :]]
+    patches = patches.reshape(len(pts), -1)
+    background = np.median(patches, axis=1)
+    flat = np.mean(np.abs(patches - background[:, None]) <= tolerance, axis=1) >= 0.5
+    return flat & (np.ptp(patches, axis=1) >= min_contrast)
+
+
+def copy_move_analysis(gray: np.ndarray) -> Dict:
+    """
+    Matches ORB keypoints of the image against itself. Many matches that
+    share the same displacement indicate a region cloned elsewhere.
+    Text-like keypoints are ignored, and a displacement that repeats at
+    twice its length (rows of a feed, lines of text) or whose matches are
+    bunched in a tiny area is treated as a repeating pattern, not a clone.
+    """
+    if cv2 is None:
+        return {"score": 0.0, "note": "OpenCV not available"}
+
+    orb = cv2.ORB_create(nfeatures=1000)
+    keypoints, descriptors = orb.detectAndCompute(gray, None)
+    if descriptors is None or len(keypoints) < 10:
+        return {"score": 0.0, "keypoints": len(keypoints or [])}
+
+    pts = np.array([kp.pt for kp in keypoints])
+    keep = ~_text_like(gray, pts)
+    text_share = round(float(1 - keep.mean()), 3)
+    pts, descriptors = pts[keep], descriptors[keep]
+    if len(pts) < 10:
+        return {"score": 0.0, "keypoints": len(keypoints), "text_like_share": text_share, "clone_pairs": 0}
+
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+    # k=3: the first match is the keypoint itself
+    matches = matcher.knnMatch(descriptors, descriptors, k=3)
+    min_shift = max(gray.shape) * 0.05
+
+    src, dst = [], []
+    for m in matches:
+        if len(m) < 3:
+            continue
+        best, second = m[1], m[2]
+        if best.distance < 40 and best.distance < 0.75 * second.distance:
+            src.append(best.queryIdx)
+            dst.append(best.trainIdx)
+    result = {"score": 0.0, "keypoints": len(keypoints), "text_like_share": text_share, "clone_pairs": 0}
+    if not src:
+        return result
+
+    src, dst = np.array(src), np.array(dst)
+    shifts = pts[dst] - pts[src]
+    far = np.linalg.norm(shifts, axis=1) > min_shift
+    shifts, src = shifts[far], src[far]
+    if len(shifts) == 0:
+        return result
+
+    # Cluster displacement vectors on a coarse grid; a cloned region gives one dense cluster
+    sign = np.where((shifts[:, 0] < 0) | ((shifts[:, 0] == 0) & (shifts[:, 1] < 0)), -1, 1)[:, None]
+    quantized = np.round(shifts * sign / 8).astype(np.int64)
+    cells, inverse, counts = np.unique(quantized, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    top = int(counts.argmax())
+    clone_pairs = int(counts[top])
+
+    # Matches at whole multiples or fractions of the displacement → periodic layout (feed rows,
+    # list items) rather than one cloned region
+    harmonic = np.zeros(len(cells), dtype=bool)
+    for k in (2, 3, 4):
+        harmonic |= np.abs(cells - k * cells[top]).max(axis=1) <= k
+        harmonic |= np.abs(k * cells - cells[top]).max(axis=1) <= k
+    harmonic[top] = False
+    periodic = bool(counts[harmonic].sum() >= max(2, 0.3 * clone_pairs))
+
+    cluster_pts = pts[src[inverse == top]]
+    extent = cluster_pts.max(axis=0) - cluster_pts.min(axis=0)
+    compact = bool(extent.max() < 0.03 * max(gray.shape) or extent.min() < 0.01 * max(gray.shape))
+
+    score = 0.0 if periodic or compact else _clip01((clone_pairs - 4) / 20)
+    result.update(score=round(score, 3), clone_pairs=clone_pairs, periodic=periodic,
+                  cluster_extent=[int(e) for e in extent])
+    return result
+
+
+# ----------------------
+# Entry point
+# ----------------------
+def analyze_image(source) -> Dict:
+    """
+    Runs all local manipulation checks on image bytes, a path or a file
+    object. CPU only, no network.
+    """
+    started = time.perf_counter()
+    # Header only: format, quantization tables and EXIF
+    img = _open(source)
+    is_jpeg = img.format == "JPEG"
+
+    # Content checks run on an upright copy of at most FORENSICS_MAX_SIDE; JPEGs are decoded
+    # straight at a reduced scale (draft) instead of at full size and then shrunk. Other
+    # formats are decoded once, into `img` (PNG EXIF may sit after the pixel data anyway).
+    if is_jpeg:
+        reduced = _open(source)
+        reduced.draft("RGB", (FORENSICS_MAX_SIDE, FORENSICS_MAX_SIDE))
+    else:
+        reduced = img
+    small = ImageOps.exif_transpose(_downscale(reduced.convert("RGB")))
+    gray_small = np.asarray(small.convert("L"))
+    grid_crop = _grid_crop(source) if is_jpeg else None
+
+    signals = {}
+    timings = {}
+    for name, fn, args in (
+        ("ela", error_level_analysis, (small,)),
+        ("jpeg", jpeg_analysis, (img, grid_crop)),
+        ("exif", exif_analysis, (img,)),
+        ("copy_move", copy_move_analysis, (gray_small,)),
+    ):
+        t = time.perf_counter()
+        try:
+            signals[name] = fn(*args)
+        except Exception as e:
+            signals[name] = {"score": 0.0, "error": str(e)}
+        timings[name] = round((time.perf_counter() - t) * 1000, 1)
+
+    score = sum(WEIGHTS[name] * signals[name]["score"] for name in WEIGHTS)
+    # A single very strong signal is enough to flag the image
+    score = max(score, max(signals[name]["score"] for name in WEIGHTS) * 0.8)
+    return {
+        "manipulation_score": round(score, 3),
+        "verdict": "Likely manipulated" if score >= MANIPULATION_THRESHOLD else "No strong signs of manipulation",
+        "signals": signals,
+        "timings_ms": timings,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
@@ -0,0 +1,150 @@
+"""
+Regression check for the image forensics scores (models/forensics.py) on
+generated images: clean text screenshots (PNG and JPEG, where repeated
+glyphs and UI rows used to look like cloned regions) and an unedited 12 MP
+camera JPEG stored upside down (EXIF orientation 3) must stay below the
+"Likely manipulated" threshold, while copy-move clones and cropped,
+re-compressed JPEGs must still be caught.
+
+Usage (from backend/):
+    python -m models.forensics_check
+    python -m models.forensics_check --seeds 8
+"""
+import argparse
+import io
+import random
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from models.forensics import analyze_image, MANIPULATION_THRESHOLD
+
+WORDS = ("the government said on monday that new rules would apply to all banks from next year "
+         "officials added that the measure was needed to protect savers and reduce risk").split()
+
+
+def font(size):
+    try:
+        return ImageFont.truetype("DejaVuSans.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def encode(img, fmt="PNG", quality=90, **params):
+    buf = io.BytesIO()
+    img.save(buf, fmt, **({"quality": quality} if fmt == "JPEG" else {}), **params)
+    return buf.getvalue()
+
+
+def text_screenshot(seed, size=(1080, 1920)):
+    rng = random.Random(seed)
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, size[0], 120), fill=(24, 119, 242))
+    draw.text((40, 35), "News Feed", fill="white", font=font(44))
+    for y in range(180, size[1] - 80, 52):
+        draw.text((40, y), " ".join(rng.choice(WORDS) for _ in range(7)), fill="black", font=font(34))
+    return img
+
+
+def feed_screenshot(seed, size=(1080, 1920)):
+    """Repeated UI rows (avatar, name, buttons) around varied text."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, size[0], 120), fill=(24, 119, 242))
+    draw.text((40, 35), "Messages", fill="white", font=font(44))
+    for y in range(150, size[1] - 200, 170):
+        draw.ellipse((30, y, 110, y + 80), fill=(200, 200, 200))
+        draw.text((130, y), "Rahul Sharma", fill="black", font=font(30))
+        draw.text((130, y + 40), " ".join(rng.choice(WORDS) for _ in range(6)), fill=(60, 60, 60), font=font(28))
+        draw.text((130, y + 90), "Like    Comment    Share", fill=(100, 100, 100), font=font(26))
+        draw.line((30, y + 140, size[0] - 30, y + 140), fill=(220, 220, 220), width=2)
+    return img
+
+
+def photo(seed, size=(1200, 900), noise=4.0, fine_detail=True):
+    """Textured, photo-like image from layered smooth noise."""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    acc = np.zeros((h, w))
+    # Scales deliberately not multiples of 8 so they can't mimic a JPEG grid
+    for scale, amp in ((7, 60), (29, 40), (113, 25), (397, 15)):
+        if scale < 16 and not fine_detail:
+            continue
+        small = rng.normal(size=(h // scale + 2, w // scale + 2)).astype(np.float32)
+        acc += np.asarray(Image.fromarray(small).resize((w, h), Image.BICUBIC)) * amp
+    rgb = np.stack([acc, acc * 0.8 + 20, acc * 0.6 + 40], axis=-1) + 128 + rng.normal(0, noise, (h, w, 3))
+    return Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8))
+
+
+def cloned(seed):
+    pixels = np.asarray(photo(seed)).copy()
+    pixels[500:700, 700:950] = pixels[100:300, 100:350]
+    return Image.fromarray(pixels)
+
+
+def rotated_camera_photo(seed):
+    # Width and height not multiples of 8, so the grid only lines up in stored (unrotated) layout
+    exif = Image.Exif()
+    exif[0x0112] = 3
+    return encode(photo(seed, size=(3997, 2995), noise=1.0, fine_detail=False), "JPEG", quality=92,
+                  exif=exif.tobytes())
+
+
+def cropped_recompressed(seed):
+    # Smooth content: the shifted grid of the first compression is only faintly visible under fine texture
+    first = Image.open(io.BytesIO(encode(photo(seed, noise=1.0, fine_detail=False), "JPEG", quality=50)))
+    return encode(first.crop((3, 5, first.width, first.height)), "JPEG", quality=95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seeds", type=int, default=4)
+    args = parser.parse_args()
+
+    def below_threshold(result):
+        return result["manipulation_score"] < MANIPULATION_THRESHOLD
+
+    def flagged(result):
+        return result["manipulation_score"] >= MANIPULATION_THRESHOLD
+
+    def grid_shifted(result):
+        return result["signals"]["jpeg"].get("grid_misaligned", False)
+
+    clean, cloned_images, recompressed = [], [], []
+    for seed in range(args.seeds):
+        for name, make in (("text", text_screenshot), ("feed", feed_screenshot)):
+            img = make(seed)
+            clean.append((f"{name}-{seed} png", encode(img)))
+            for quality in (50, 75, 95):
+                clean.append((f"{name}-{seed} jpeg q{quality}", encode(img, "JPEG", quality)))
+        clean.append((f"photo-{seed} jpeg", encode(photo(seed), "JPEG")))
+        cloned_images.append((f"clone-{seed} jpeg", encode(cloned(seed), "JPEG")))
+        cloned_images.append((f"clone-{seed} png", encode(cloned(seed))))
+        recompressed.append((f"crop-recompress-{seed}", cropped_recompressed(seed)))
+    clean.append(("camera-12mp jpeg rotated", rotated_camera_photo(0)))
+
+    failures = []
+    slowest = 0.0
+    for group, cases, ok in (("clean", clean, below_threshold),
+                             ("cloned", cloned_images, flagged),
+                             ("recompressed", recompressed, grid_shifted)):
+        scores = []
+        for name, data in cases:
+            result = analyze_image(data)
+            slowest = max(slowest, result["elapsed_ms"])
+            score = result["manipulation_score"]
+            scores.append(score)
+            if not ok(result):
+                failures.append((name, score, {k: v["score"] for k, v in result["signals"].items()}))
+        print(f"{group:<12} {len(cases):>3} images   min {min(scores):.2f}   max {max(scores):.2f}")
+    print(f"slowest      {slowest:.0f} ms")
+
+    for name, score, signals in failures:
+        print(f"  FAIL: {name} scored {score:.2f} {signals}")
+    print("\n✅ Forensics check OK" if not failures else "\n❌ Forensics check failed")
+    raise SystemExit(0 if not failures else 1)
+
+
+if __name__ == "__main__":
+    main()
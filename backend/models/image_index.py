@@ -0,0 +1,215 @@
+import hashlib
+import io
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import numpy as np
+from PIL import Image, ImageOps
+
+# ----------------------
+# Configuration
+# ----------------------
+# "phash" (DCT based, robust to re-encoding and resizing) or "dhash" (gradient based, cheaper)
+IMAGE_HASH_METHOD = os.environ.get("IMAGE_HASH_METHOD", "phash").lower()
+# Max Hamming distance (out of 64 bits) for two images to count as the same
+IMAGE_HASH_THRESHOLD = int(os.environ.get("IMAGE_HASH_THRESHOLD", "6"))
+IMAGE_CACHE_SIZE = int(os.environ.get("IMAGE_CACHE_SIZE", "10000"))
+# Text signatures: binarized at this width, compared in TEXT_TILE x TEXT_TILE tiles; two images
+# show the same text if no tile has more than TEXT_MAX_TILE_CHANGE of its pixels flipped.
+# Re-encoding and resizing flip scattered edge pixels (under ~0.18 per tile), a changed word
+# or digit flips a block of them (0.28 and up, down to ~22 px text on a 1080 px wide screenshot).
+TEXT_SIGNATURE_WIDTH = 1024
+TEXT_TILE = 16
+TEXT_MAX_TILE_CHANGE = 0.23
+
+HASH_BITS = 64
+CHUNKS = 8
+CHUNK_BITS = HASH_BITS // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)
+    m = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n))
+    m[0] *= 1 / np.sqrt(2)
+    return m * np.sqrt(2 / n)
+
+
+DCT_32 = _dct_matrix(32)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    value = 0
+    for bit in bits.flatten():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def load_gray(source, size) -> np.ndarray:
+    """Decodes image bytes/path/file straight to a small grayscale array."""
+    img = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    # For JPEGs this makes the decoder skip most of the full-resolution work
+    img.draft("L", (size[0] * 4, size[1] * 4))
+    img = ImageOps.exif_transpose(img).convert("L").resize(size, Image.LANCZOS)
+    return np.asarray(img, dtype=np.float64)
+
+
+def phash(source) -> int:
+    pixels = load_gray(source, (32, 32))
+    dct = DCT_32 @ pixels @ DCT_32.T
+    low = dct[:8, :8].flatten()
+    # Compare against the median of the low frequencies, ignoring the DC term
+    return _bits_to_int(low > np.median(low[1:]))
+
+
+def dhash(source) -> int:
+    pixels = load_gray(source, (9, 8))
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def image_hash(source) -> Optional[int]:
+    """Perceptual hash of an image, or None if it can't be decoded."""
+    try:
+        return dhash(source) if IMAGE_HASH_METHOD == "dhash" else phash(source)
+    except Exception as e:
+        print(f"Image hashing failed: {e}")
+        return None
+
+
+def content_hash(source) -> str:
+    """SHA-256 of the uploaded file itself (bytes or a spill file path): exact repeats only."""
+    digest = hashlib.sha256()
+    if isinstance(source, bytes):
+        digest.update(source)
+    else:
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def text_signature(source) -> Dict:
+    """
+    Upright image binarized at TEXT_SIGNATURE_WIDTH, packed and compressed
+    (a few KB for a screenshot). Unlike the perceptual hash it keeps enough
+    detail to tell one word, or one digit, from another.
+    """
+    img = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+    img.draft("L", (TEXT_SIGNATURE_WIDTH, TEXT_SIGNATURE_WIDTH))
+    img = ImageOps.exif_transpose(img).convert("L")
+    height = max(1, round(TEXT_SIGNATURE_WIDTH * img.height / img.width))
+    bits = np.asarray(img.resize((TEXT_SIGNATURE_WIDTH, height), Image.BOX)) < 128
+    return {"shape": bits.shape, "bits": zlib.compress(np.packbits(bits).tobytes())}
+
+
+def _unpack(signature: Dict) -> np.ndarray:
+    h, w = signature["shape"]
+    return np.unpackbits(np.frombuffer(zlib.decompress(signature["bits"]), dtype=np.uint8))[:h * w].reshape(h, w)
+
+
+def same_text(a: Dict, b: Dict) -> bool:
+    """True if two text signatures show the same text (see TEXT_MAX_TILE_CHANGE)."""
+    (ha, wa), (hb, wb) = a["shape"], b["shape"]
+    # Rounding of a resized copy's aspect ratio moves the height by a pixel or two; more is a crop
+    if wa != wb or abs(ha - hb) > 2:
+        return False
+    h = min(ha, hb) // TEXT_TILE * TEXT_TILE
+    w = wa // TEXT_TILE * TEXT_TILE
+    if h == 0 or w == 0:
+        return False
+    flipped = (_unpack(a)[:h, :w] ^ _unpack(b)[:h, :w]).reshape(h // TEXT_TILE, TEXT_TILE, w // TEXT_TILE, TEXT_TILE)
+    return bool(flipped.mean(axis=(1, 3)).max() <= TEXT_MAX_TILE_CHANGE)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateIndex:
+    """
+    Multi-index hashing over 64-bit perceptual hashes. Each hash is split
+    into 8 byte-sized chunks, each chunk indexed in its own table; by the
+    pigeonhole principle any hash within 7 bits of a query shares at least
+    one chunk exactly, so lookups only compare against those candidates.
+    Bounded in size with LRU eviction.
+    """
+
+    def __init__(self, maxsize: int = IMAGE_CACHE_SIZE, threshold: int = IMAGE_HASH_THRESHOLD, name: str = "images"):
+        self.maxsize = maxsize
+        self.threshold = min(threshold, CHUNKS - 1)
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._tables = [dict() for _ in range(CHUNKS)]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _chunks(h: int):
+        return [(h >> (i * CHUNK_BITS)) & CHUNK_MASK for i in range(CHUNKS)]
+
+    def lookup(self, h: Optional[int]) -> Optional[Dict]:
+        """Returns {"value", "distance", "hash"} for the closest stored image within threshold."""
+        if h is None:
+            return None
+        with self._lock:
+            candidates = set()
+            for table, chunk in zip(self._tables, self._chunks(h)):
+                candidates.update(table.get(chunk, ()))
+            best = None
+            for candidate in candidates:
+                distance = hamming(h, candidate)
+                if distance <= self.threshold and (best is None or distance < best[1]):
+                    best = (candidate, distance)
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best[0])
+            return {"value": self._entries[best[0]], "distance": best[1], "hash": f"{best[0]:016x}"}
+
+    def matches(self, h: Optional[int]) -> List[Dict]:
+        """Like lookup, but every stored image within threshold, closest first."""
+        if h is None:
+            return []
+        with self._lock:
+            candidates = set()
+            for table, chunk in zip(self._tables, self._chunks(h)):
+                candidates.update(table.get(chunk, ()))
+            found = sorted((hamming(h, c), c) for c in candidates)
+            found = [(distance, c) for distance, c in found if distance <= self.threshold]
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return [{"value": self._entries[c], "distance": distance, "hash": f"{c:016x}"} for distance, c in found]
+
+    def add(self, h: Optional[int], value: Any) -> None:
+        if h is None:
+            return
+        with self._lock:
+            if h not in self._entries:
+                for table, chunk in zip(self._tables, self._chunks(h)):
+                    table.setdefault(chunk, set()).add(h)
+            self._entries[h] = value
+            self._entries.move_to_end(h)
+            while len(self._entries) > self.maxsize:
+                old, _ = self._entries.popitem(last=False)
+                for table, chunk in zip(self._tables, self._chunks(old)):
+                    bucket = table.get(chunk)
+                    if bucket is not None:
+                        bucket.discard(old)
+                        if not bucket:
+                            del table[chunk]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"name": self.name, "size": len(self._entries), "hits": self.hits,
+                    "misses": self.misses, "threshold": self.threshold}
+
+
+# Reverse-search results are shared between near-duplicates. OCR results depend on the exact
+# text in the image, so routes/ocr.py confirms its near-duplicates with same_text as well.
+detect_image_index = NearDuplicateIndex(name="detect")
@@ -0,0 +1,287 @@
+"""
+Offline news corpus for verification without NewsAPI/GNews.
+
+Trusted articles are ingested into an on-disk BM25 inverted index (plus
+optional dense embeddings for re-ranking). Everything is stored as .npy
+arrays and loaded memory-mapped, so startup is near instant and a query
+only touches the postings of its own terms.
+
+Build from the Fake.csv/True.csv format used by models/evaluation.py
+(title, text, subject, date) or from a JSON-lines crawl (title, text or
+content/description, url, source, published). Only ingest trusted sources.
+
+Usage (from backend/):
+    python -m models.news_index build True.csv --source Reuters
+    python -m models.news_index build crawl.jsonl --out /data/news_index --embed
+    python -m models.news_index search "senate passes budget bill"
+"""
+import argparse
+import csv
+import json
+import mmap
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+
+from models.relevance import terms, STOPWORDS
+
+# ----------------------
+# Configuration
+# ----------------------
+NEWS_INDEX_DIR = os.environ.get(
+    "NEWS_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "news_index")
+)
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Article text kept per document for display and relevance filtering
+NEWS_INDEX_STORE_CHARS = int(os.environ.get("NEWS_INDEX_STORE_CHARS", "1500"))
+# Long inputs (e.g. when keyword extraction falls back to the raw text) are cut to this many query terms
+NEWS_INDEX_MAX_QUERY_TERMS = int(os.environ.get("NEWS_INDEX_MAX_QUERY_TERMS", "64"))
+# BM25 candidates re-ranked with embeddings, and the weight of the dense score
+NEWS_INDEX_RERANK = int(os.environ.get("NEWS_INDEX_RERANK", "50"))
+NEWS_INDEX_DENSE_WEIGHT = float(os.environ.get("NEWS_INDEX_DENSE_WEIGHT", "0.5"))
+
+FORMAT_VERSION = 1
+
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+
+def index_terms(text: str) -> List[str]:
+    return [t for t in terms(text) if t not in STOPWORDS]
+
+
+# ----------------------
+# Ingest
+# ----------------------
+def read_articles(path: str, source: Optional[str] = None) -> Iterator[Dict]:
+    """Yields {title, text, url, source, published} from a CSV or JSON-lines file."""
+    default_source = source or os.path.splitext(os.path.basename(path))[0]
+
+    def normalize(row: Dict) -> Optional[Dict]:
+        title = (row.get("title") or "").strip()
+        text = (row.get("text") or row.get("content") or row.get("description") or "").strip()
+        if not title and not text:
+            return None
+        return {
+            "title": title,
+            "text": text[:NEWS_INDEX_STORE_CHARS],
+            "url": row.get("url") or "",
+            "source": source or row.get("source") or default_source,
+            "published": row.get("published") or row.get("publishedAt") or row.get("date") or "",
+            "_body": text
+        }
+
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for row in rows:
+            article = normalize(row)
+            if article:
+                yield article
+
+
+def build_index(paths: List[str], out_dir: str = NEWS_INDEX_DIR, source: Optional[str] = None,
+                embed: bool = False) -> Dict:
+    os.makedirs(out_dir, exist_ok=True)
+    vocab = {}
+    postings = []   # per term id: list of (doc id, tf)
+    doc_lengths = []
+    embed_texts = []
+
+    with open(os.path.join(out_dir, "docs.jsonl"), "wb") as docs_file:
+        doc_offsets = []
+        for path in paths:
+            for article in read_articles(path, source):
+                body = article.pop("_body")
+                counts = Counter(index_terms(article["title"] + " " + body))
+                doc_id = len(doc_lengths)
+                for term, tf in counts.items():
+                    term_id = vocab.get(term)
+                    if term_id is None:
+                        term_id = vocab[term] = len(postings)
+                        postings.append([])
+                    postings[term_id].append((doc_id, tf))
+                doc_lengths.append(sum(counts.values()))
+                doc_offsets.append(docs_file.tell())
+                docs_file.write(json.dumps(article, ensure_ascii=False).encode("utf-8") + b"\n")
+                if embed:
+                    embed_texts.append(article["title"] + ". " + article["text"])
+        doc_offsets.append(docs_file.tell())
+
+    n_docs = len(doc_lengths)
+    if n_docs == 0:
+        raise ValueError("No articles found in the input files")
+
+    lengths = np.asarray(doc_lengths, dtype=np.float32)
+    avgdl = float(lengths.mean()) or 1.0
+    offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(p) for p in postings])
+    doc_ids = np.fromiter((d for p in postings for d, _ in p), dtype=np.int32, count=int(offsets[-1]))
+    tfs = np.fromiter((min(tf, 65535) for p in postings for _, tf in p), dtype=np.uint16, count=int(offsets[-1]))
+    df = np.diff(offsets).astype(np.float64)
+
+    np.save(os.path.join(out_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(out_dir, "postings.npy"), doc_ids)
+    np.save(os.path.join(out_dir, "tfs.npy"), tfs)
+    np.save(os.path.join(out_dir, "idf.npy"), np.log(1 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32))
+    # BM25 length normalization, precomputed per document
+    np.save(os.path.join(out_dir, "doc_norms.npy"), (BM25_K1 * (1 - BM25_B + BM25_B * lengths / avgdl)).astype(np.float32))
+    np.save(os.path.join(out_dir, "doc_offsets.npy"), np.asarray(doc_offsets, dtype=np.int64))
+    with open(os.path.join(out_dir, "vocab.json"), "w", encoding="utf-8") as f:
+        json.dump(vocab, f, ensure_ascii=False)
+
+    embedding_model = None
+    if embed:
+        from models.embeddings import get_encoder
+        encoder = get_encoder()
+        if encoder is None:
+            print("Skipping embeddings: sentence encoder unavailable")
+        else:
+            np.save(os.path.join(out_dir, "embeddings.npy"), encoder.encode(embed_texts).astype(np.float16))
+            embedding_model = encoder.model_name
+
+    meta = {"version": FORMAT_VERSION, "docs": n_docs, "terms": len(vocab), "avgdl": avgdl,
+            "k1": BM25_K1, "b": BM25_B, "embedding_model": embedding_model, "built_at": int(time.time())}
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+# ----------------------
+# Query
+# ----------------------
+class NewsIndex:
+    def __init__(self, path: str = NEWS_INDEX_DIR):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported news index version {self.meta.get('version')}; rebuild it")
+        with open(os.path.join(path, "vocab.json"), encoding="utf-8") as f:
+            self.vocab = json.load(f)
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode="r")
+
+        self.offsets = load("offsets.npy")
+        self.postings = load("postings.npy")
+        self.tfs = load("tfs.npy")
+        self.idf = load("idf.npy")
+        self.doc_norms = load("doc_norms.npy")
+        self.doc_offsets = load("doc_offsets.npy")
+        embeddings_path = os.path.join(path, "embeddings.npy")
+        self.embeddings = load("embeddings.npy") if os.path.exists(embeddings_path) else None
+
+        self._docs_file = open(os.path.join(path, "docs.jsonl"), "rb")
+        self._docs = mmap.mmap(self._docs_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return int(self.meta["docs"])
+
+    def document(self, doc_id: int) -> Dict:
+        start, end = int(self.doc_offsets[doc_id]), int(self.doc_offsets[doc_id + 1])
+        return json.loads(self._docs[start:end])
+
+    def bm25(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self), dtype=np.float32)
+        query_terms = list(dict.fromkeys(index_terms(query)))[:NEWS_INDEX_MAX_QUERY_TERMS]
+        for term in query_terms:
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+            docs = self.postings[start:end]
+            tf = self.tfs[start:end].astype(np.float32)
+            # Each doc appears once per term, so plain fancy-index addition is safe
+            scores[docs] += self.idf[term_id] * tf * (self.meta["k1"] + 1) / (tf + self.doc_norms[docs])
+        return scores
+
+    def search(self, query: str, text: str = "", k: int = 10) -> List[Dict]:
+        """Top-k documents for the query, each with a "score"; re-ranked with embeddings if present."""
+        scores = self.bm25(query)
+        hits = np.flatnonzero(scores)
+        if hits.size == 0:
+            return []
+        pool = min(hits.size, max(k, NEWS_INDEX_RERANK if self.embeddings is not None else k))
+        top = hits[np.argpartition(-scores[hits], pool - 1)[:pool]]
+        ranked = scores[top] / scores[top].max()
+
+        if self.embeddings is not None and NEWS_INDEX_DENSE_WEIGHT > 0:
+            from models.embeddings import get_encoder
+            encoder = get_encoder()
+            if encoder is not None and encoder.model_name == self.meta.get("embedding_model"):
+                query_vec = encoder.encode([text or query])[0]
+                dense = np.asarray(self.embeddings[top], dtype=np.float32) @ query_vec
+                ranked = (1 - NEWS_INDEX_DENSE_WEIGHT) * ranked + NEWS_INDEX_DENSE_WEIGHT * dense
+
+        order = np.argsort(-ranked)[:k]
+        results = []
+        for i in order:
+            doc = self.document(int(top[i]))
+            doc["score"] = round(float(ranked[i]), 4)
+            results.append(doc)
+        return results
+
+    def stats(self) -> Dict:
+        return {"path": self.path, "docs": len(self), "terms": self.meta.get("terms"),
+                "embeddings": self.embeddings is not None}
+
+
+_lock = threading.Lock()
+_index = None
+_warned = False
+
+
+def get_news_index() -> Optional[NewsIndex]:
+    """Returns the shared memory-mapped NewsIndex, or None if none has been built."""
+    global _index, _warned
+    if _index is None and not _warned:
+        with _lock:
+            if _index is None and not _warned:
+                try:
+                    _index = NewsIndex(NEWS_INDEX_DIR)
+                except Exception as e:
+                    print(f"Local news index unavailable at {NEWS_INDEX_DIR} ({e}); "
+                          "build one with `python -m models.news_index build`.")
+                    _warned = True
+    return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Ingest articles into a new index")
+    build.add_argument("inputs", nargs="+", help="CSV (title,text,...) or JSON-lines files")
+    build.add_argument("--out", default=NEWS_INDEX_DIR)
+    build.add_argument("--source", help="Source name for every article (e.g. Reuters for True.csv)")
+    build.add_argument("--embed", action="store_true", help="Also store dense embeddings for re-ranking")
+    search = sub.add_parser("search", help="Query an existing index")
+    search.add_argument("query")
+    search.add_argument("--index", default=NEWS_INDEX_DIR)
+    search.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        started = time.perf_counter()
+        meta = build_index(args.inputs, args.out, args.source, args.embed)
+        print(f"✅ Indexed {meta['docs']} articles, {meta['terms']} terms into {args.out} "
+              f"in {time.perf_counter() - started:.1f}s")
+    else:
+        index = NewsIndex(args.index)
+        started = time.perf_counter()
+        results = index.search(args.query, k=args.k)
+        elapsed = (time.perf_counter() - started) * 1000
+        for doc in results:
+            print(f"{doc['score']:.3f}  {doc['source']}  {doc['title']}")
+        print(f"{len(results)} results in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Shared NLTK resources for keyword extraction, loaded once per process.
+
+Corpora are not downloaded at import time. Fetch them when building the
+image (see Dockerfile) or by hand:
+    python -m models.nlp_resources
+"""
+import os
+import threading
+from functools import lru_cache
+from typing import List, Tuple
+import nltk
+
+# ----------------------
+# Configuration
+# ----------------------
+# Only this much of the input is tokenized and POS-tagged for keywords
+KEYWORD_MAX_CHARS = int(os.environ.get("KEYWORD_MAX_CHARS", "4000"))
+KEYWORD_MAX_TOKENS = int(os.environ.get("KEYWORD_MAX_TOKENS", "300"))
+
+# (resource path, download id) — newer NLTK releases use the *_tab / *_eng names
+REQUIRED_DATA = [
+    [("tokenizers/punkt", "punkt"), ("tokenizers/punkt_tab", "punkt_tab")],
+    [("corpora/wordnet", "wordnet"), ("corpora/wordnet.zip", "wordnet")],
+    [("corpora/stopwords", "stopwords"), ("corpora/stopwords.zip", "stopwords")],
+    [("taggers/averaged_perceptron_tagger", "averaged_perceptron_tagger"),
+     ("taggers/averaged_perceptron_tagger_eng", "averaged_perceptron_tagger_eng")],
+]
+
+_lock = threading.Lock()
+_resources = None
+_warned = False
+
+
+def missing_data() -> List[str]:
+    """Names of required NLTK packages that aren't installed (checked offline)."""
+    missing = []
+    for alternatives in REQUIRED_DATA:
+        found = False
+        for path, _ in alternatives:
+            try:
+                nltk.data.find(path)
+                found = True
+                break
+            except LookupError:
+                continue
+        if not found:
+            missing.append(alternatives[0][1])
+    return missing
+
+
+def download_data() -> None:
+    """Downloads every NLTK package keyword extraction may need. Meant for build time."""
+    for alternatives in REQUIRED_DATA:
+        for _, package in alternatives:
+            nltk.download(package, quiet=True)
+
+
+class NLPResources:
+    def __init__(self):
+        from nltk.corpus import stopwords
+        from nltk.stem import WordNetLemmatizer
+        from nltk.tag import PerceptronTagger
+
+        self.stop_words = frozenset(stopwords.words('english'))
+        self.lemmatizer = WordNetLemmatizer()
+        self.tagger = PerceptronTagger()
+        # Force WordNet to load now rather than on the first request
+        self.lemmatizer.lemmatize("warmup")
+        self.lemmatize = lru_cache(maxsize=50000)(self.lemmatizer.lemmatize)
+
+    def tokenize(self, text: str) -> List[str]:
+        return nltk.word_tokenize(text[:KEYWORD_MAX_CHARS])
+
+    def tag(self, words: List[str]) -> List[Tuple[str, str]]:
+        return self.tagger.tag(words[:KEYWORD_MAX_TOKENS])
+
+
+def get_resources():
+    """Returns the shared NLPResources, or None if NLTK data is missing."""
+    global _resources, _warned
+    if _resources is None and not _warned:
+        with _lock:
+            if _resources is None:
+                missing = missing_data()
+                if missing:
+                    if not _warned:
+                        print(f"NLTK data missing ({', '.join(missing)}); run `python -m models.nlp_resources`. "
+                              "Keyword extraction will use the raw text.")
+                        _warned = True
+                    return None
+                _resources = NLPResources()
+    return _resources
+
+
+if __name__ == "__main__":
+    download_data()
+    missing = missing_data()
+    if missing:
+        raise SystemExit(f"Still missing NLTK data: {', '.join(missing)}")
+    get_resources()
+    print("✅ NLTK resources ready")
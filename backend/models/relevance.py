@@ -0,0 +1,105 @@
+import os
+import re
+from typing import Dict, List
+import numpy as np
+
+# ----------------------
+# Configuration
+# ----------------------
+# An article is relevant if it contains this many query keywords...
+RELEVANCE_MIN_OVERLAP = int(os.environ.get("RELEVANCE_MIN_OVERLAP", "2"))
+# ...making up at least this share of the query's keywords...
+RELEVANCE_MIN_OVERLAP_SHARE = float(os.environ.get("RELEVANCE_MIN_OVERLAP_SHARE", "0.5"))
+# ...or its TF-IDF cosine similarity to the input text exceeds this
+# (0.25 calibrated on the labeled cases in `python -m models.relevance_benchmark`)
+RELEVANCE_SIMILARITY_THRESHOLD = float(os.environ.get("RELEVANCE_SIMILARITY_THRESHOLD", "0.25"))
+# Only this much of the user text is used for similarity
+RELEVANCE_MAX_CHARS = int(os.environ.get("RELEVANCE_MAX_CHARS", "5000"))
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Boolean operators extract_keywords puts into search queries
+QUERY_OPERATORS = {"and", "or", "not"}
+# Function words (as stemmed by terms()); short claims are used as the query verbatim
+STOPWORDS = frozenset((
+    "a an the of to in on at by for from with as is are was were be been being it its this that these those "
+    "he she they we you i his her their our your him them us me my has have had do doe did will would can "
+    "could should may might must shall said say says about after before over under into than then there "
+    "here which who whom whose what when where why how also just more most other some such only own same "
+    "so too very s t"
+).split()) | QUERY_OPERATORS
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def _stem(token: str) -> str:
+    # Just enough folding that "subsidy"/"subsidies" and "market"/"markets" meet
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def terms(text: str) -> List[str]:
+    """Lowercased, lightly stemmed word tokens."""
+    return [_stem(t) for t in tokenize(text)]
+
+
+def article_text(article: Dict) -> str:
+    return " ".join([article.get("title") or "", article.get("description") or "", article.get("content") or ""])
+
+
+def relevance_scores(articles: List[Dict], query: str, text: str) -> Dict[str, np.ndarray]:
+    """
+    Scores all candidate articles against the query/text in one pass.
+    Returns per-article keyword overlap counts, the share of query keywords
+    they make up, and TF-IDF cosine similarities.
+    """
+    n = len(articles)
+    if n == 0:
+        return {"overlap": np.zeros(0, dtype=np.int64), "overlap_share": np.zeros(0), "similarity": np.zeros(0)}
+
+    docs = [terms(text[:RELEVANCE_MAX_CHARS])]
+    docs += [terms(article_text(a)) for a in articles]
+
+    vocab = {}
+    rows, cols = [], []
+    for i, tokens in enumerate(docs):
+        for token in tokens:
+            rows.append(i)
+            cols.append(vocab.setdefault(token, len(vocab)))
+
+    counts = np.zeros((len(docs), max(len(vocab), 1)))
+    if rows:
+        np.add.at(counts, (np.array(rows), np.array(cols)), 1.0)
+
+    # Keyword overlap: distinct query terms present as whole words in each article
+    query_terms = set(terms(query)) - STOPWORDS
+    query_cols = [vocab[t] for t in query_terms if t in vocab]
+    overlap = (counts[1:, query_cols] > 0).sum(axis=1) if query_cols else np.zeros(n, dtype=np.int64)
+    overlap_share = overlap / max(len(query_terms), 1)
+
+    # TF-IDF (sublinear tf, smoothed idf) cosine between the input text and every article
+    df = (counts > 0).sum(axis=0)
+    idf = np.log((1 + len(docs)) / (1 + df)) + 1.0
+    tfidf = np.where(counts > 0, 1.0 + np.log(np.maximum(counts, 1.0)), 0.0) * idf
+    norms = np.linalg.norm(tfidf, axis=1)
+    norms[norms == 0] = 1.0
+    tfidf /= norms[:, None]
+    similarity = tfidf[1:] @ tfidf[0]
+
+    return {"overlap": overlap, "overlap_share": overlap_share, "similarity": similarity}
+
+
+def relevant_mask(articles: List[Dict], query: str, text: str) -> List[bool]:
+    scores = relevance_scores(articles, query, text)
+    keywords_match = (scores["overlap"] >= RELEVANCE_MIN_OVERLAP) & (scores["overlap_share"] >= RELEVANCE_MIN_OVERLAP_SHARE)
+    mask = keywords_match | (scores["similarity"] > RELEVANCE_SIMILARITY_THRESHOLD)
+    return [bool(m) for m in mask]
+
+
+def filter_relevant(articles: List[Dict], query: str, text: str) -> List[Dict]:
+    """Keeps only articles contextually relevant to the input query/text."""
+    return [a for a, keep in zip(articles, relevant_mask(articles, query, text)) if keep]
@@ -0,0 +1,303 @@
+"""
+Benchmarks the vectorized relevance scoring (models/relevance.py) against the
+previous per-article SequenceMatcher implementation: speed on synthetic
+text, and accuracy on labeled claims (short, and as longer forwarded
+messages) whose candidate articles either report the claim, share names and wording with it but report something else
+(near misses), or are about another story entirely. Also sweeps the TF-IDF
+similarity threshold over the labeled set, for calibrating
+RELEVANCE_SIMILARITY_THRESHOLD.
+
+Usage (from backend/):
+    python -m models.relevance_benchmark
+    python -m models.relevance_benchmark --words 200 2000 8000 --articles 20 --repeat 3
+"""
+import argparse
+import random
+import time
+from difflib import SequenceMatcher
+
+import numpy as np
+
+from models.relevance import (relevance_scores, relevant_mask, RELEVANCE_MIN_OVERLAP,
+                              RELEVANCE_MIN_OVERLAP_SHARE, RELEVANCE_SIMILARITY_THRESHOLD)
+
+VOCAB = ("government policy election minister vaccine health economy market inflation bank "
+         "climate flood storm police court ruling protest president parliament budget tax "
+         "energy oil price school student hospital virus report study university official "
+         "agency city border trade war ceasefire talks summit leader company shares").split()
+
+# Each claim, also as a longer forwarded message with the keyword query extract_keywords()
+# builds for it, and its articles: ones that report it, and near misses that share names
+# or wording but report something else. Other claims' articles are its irrelevant ones.
+CASES = [
+    {
+        "claim": "RBI raises repo rate by 25 basis points to curb inflation",
+        "text": ("BREAKING: The RBI has raised the repo rate by 25 basis points today to curb inflation. Home loan and"
+                 " car loan EMIs will go up from next month. Banks are expected to pass on the hike to borrowers "
+                 "quickly. Share this with your family before your bank calls you!"),
+        "keywords": "rbi repo rate basis point inflation home loan",
+        "relevant": [
+            ("Reserve Bank of India hikes repo rate to 6.5% as inflation stays high",
+             "The RBI's monetary policy committee raised the repo rate by 25 basis points on Wednesday, its sixth increase since May."),
+            ("RBI rate hike: what the 25 bps increase in repo rate means for your home loan EMI",
+             "Borrowers will pay more after the central bank raised its key lending rate to tackle inflation."),
+        ],
+        "near_miss": [
+            ("Retail inflation eases to 4.8% in March, government data shows",
+             "Consumer price inflation cooled for a second month as food prices fell, statistics ministry data showed."),
+            ("RBI imposes monetary penalty on two cooperative banks",
+             "The Reserve Bank of India fined the lenders for non-compliance with KYC directions."),
+            ("US Federal Reserve raises interest rates by 25 basis points",
+             "The Fed lifted its benchmark rate to a 22-year high and left the door open to further tightening to curb inflation."),
+        ],
+    },
+    {
+        "claim": "WHO approves a new malaria vaccine for children in Africa",
+        "text": ("Good news for parents! The WHO has approved a new malaria vaccine for children in Africa. The "
+                 "vaccine is cheap and can be made in large quantities, and doctors say it will save many young lives."
+                 " Countries will start giving the shots next year, according to health officials."),
+        "keywords": "good news parent who new malaria vaccine",
+        "relevant": [
+            ("WHO recommends R21 malaria vaccine for use in children",
+             "The World Health Organization backed a second malaria vaccine, developed by Oxford University, for children in Africa."),
+            ("Second malaria vaccine gets WHO approval, rollout in African countries next year",
+             "Health officials say the low-cost shot could protect millions of children from malaria."),
+        ],
+        "near_miss": [
+            ("WHO warns of rising dengue cases across South Asia",
+             "The World Health Organization said dengue infections had doubled, urging countries to step up mosquito control."),
+            ("Childhood vaccination rates fell during the pandemic, UNICEF says",
+             "Millions of children in Africa and Asia missed routine measles and polio shots, the agency said."),
+        ],
+    },
+    {
+        "claim": "Heavy floods in Assam displace thousands of people",
+        "text": ("Heavy floods in Assam have displaced thousands of people. The Brahmaputra river is flowing above the"
+                 " danger mark and many villages are under water. People are living in relief camps and need food and "
+                 "clean water. Please donate and share this message."),
+        "keywords": "heavy flood assam thousand people brahmaputra river",
+        "relevant": [
+            ("Assam floods: over 50,000 displaced as Brahmaputra overflows",
+             "Floodwaters submerged hundreds of villages in Assam, forcing thousands of people into relief camps."),
+            ("Flood situation in Assam worsens after heavy rain, thousands shifted to relief camps",
+             "The state disaster management authority said 12 districts were affected by the floods."),
+        ],
+        "near_miss": [
+            ("Assam government announces wage hike for tea garden workers",
+             "The state cabinet approved a raise in daily wages for thousands of tea plantation workers in Assam."),
+            ("Floods in Pakistan's Sindh province kill 20 people",
+             "Heavy monsoon rain displaced thousands of families in southern Pakistan, officials said."),
+        ],
+    },
+    {
+        "claim": "Election Commission announces dates for Karnataka assembly elections",
+        "text": ("The Election Commission has announced the dates for the Karnataka assembly elections. Voting will "
+                 "take place in a single phase and results will be declared three days later. The model code of "
+                 "conduct is now in force across the state, officials said."),
+        "keywords": "election commission date karnataka assembly voting single",
+        "relevant": [
+            ("Karnataka assembly polls to be held on May 10, counting on May 13",
+             "The Election Commission of India announced the schedule for the Karnataka assembly election on Wednesday."),
+            ("EC announces Karnataka election dates; model code of conduct comes into force",
+             "Chief Election Commissioner said voting for all 224 assembly seats in Karnataka will take place in a single phase."),
+        ],
+        "near_miss": [
+            ("Election Commission issues notice to party over hate speech remarks",
+             "The poll body sought a reply within 48 hours over remarks made at a rally."),
+            ("Karnataka cabinet approves new industrial policy",
+             "The Karnataka government said the policy aims to attract investment of 5 lakh crore and create jobs."),
+        ],
+    },
+    {
+        "claim": "India beats Australia to win the Cricket World Cup final",
+        "text": ("India beats Australia to win the Cricket World Cup final! What a match it was, the team chased the "
+                 "target with six wickets in hand. Fans are celebrating on the streets across the country tonight. "
+                 "Proud moment for every Indian."),
+        "keywords": "india australia cricket world cup final match",
+        "relevant": [
+            ("India crowned World Cup champions after beating Australia in final",
+             "India won the Cricket World Cup final by six wickets against Australia in Ahmedabad on Sunday."),
+            ("World Cup final: India defeat Australia to lift the trophy",
+             "Fans celebrated across the country after India's victory over Australia in the World Cup final."),
+        ],
+        "near_miss": [
+            ("Australia win toss and elect to bat in first Test against India",
+             "Australia's captain chose to bat first on a dry pitch in Nagpur on the opening day of the Test series."),
+            ("FIFA World Cup final: Argentina beat France on penalties",
+             "Lionel Messi led Argentina to the World Cup title after a dramatic final in Qatar."),
+        ],
+    },
+    {
+        "claim": "Apple to launch iPhone 16 with new AI features in September",
+        "text": ("Apple is going to launch the iPhone 16 with new AI features in September. The new phone will come "
+                 "with a faster chip and a better camera, and the AI tools will be built into iOS. Prices in India are"
+                 " expected to start at around 80,000 rupees."),
+        "keywords": "apple iphone new ai feature september phone",
+        "relevant": [
+            ("iPhone 16 launch set for September with Apple Intelligence features",
+             "Apple is expected to unveil the iPhone 16 lineup at its September event, with new AI tools built into iOS."),
+            ("Apple confirms September event for iPhone 16, AI features to headline",
+             "The company sent invites for the launch, where the iPhone 16 and its AI features will be shown."),
+        ],
+        "near_miss": [
+            ("Samsung unveils Galaxy phones with new AI features",
+             "Samsung's latest smartphones bring AI translation and photo editing, the company said at its launch event."),
+            ("Apple shares fall after weak iPhone sales in China",
+             "Apple stock dropped 3% after analysts reported a decline in iPhone demand in China."),
+        ],
+    },
+    {
+        "claim": "Government bans single-use plastic across the country from July 1",
+        "text": ("From July 1 the government has banned single-use plastic across the country. Straws, plastic "
+                 "cutlery, earbuds and thin carry bags can no longer be made or sold. Shops caught selling them will "
+                 "face heavy fines, so tell everyone you know."),
+        "keywords": "july government single-use plastic country straw cutlery",
+        "relevant": [
+            ("Single-use plastic ban comes into force nationwide from July 1",
+             "The environment ministry said items such as plastic straws, cutlery and earbuds are banned across the country from July 1."),
+            ("Centre notifies ban on single-use plastic items, violators face fines",
+             "The government has banned the manufacture, sale and use of identified single-use plastic items from July 1."),
+        ],
+        "near_miss": [
+            ("Government extends deadline for plastic waste management rules",
+             "Producers get six more months to comply with plastic packaging recycling targets, the ministry said."),
+            ("Maharashtra bans firecrackers during Diwali to curb pollution",
+             "The state government banned the sale of firecrackers in several cities from November 1."),
+        ],
+    },
+    {
+        "claim": "Earthquake of magnitude 7.8 hits Turkey and Syria, killing thousands",
+        "text": ("A 7.8 magnitude earthquake has hit Turkey and Syria, killing thousands of people. Many buildings "
+                 "collapsed while people were sleeping, and rescue teams from many countries are searching the rubble "
+                 "for survivors. Pray for the victims and their families."),
+        "keywords": "magnitude earthquake turkey syria thousand people many",
+        "relevant": [
+            ("Turkey-Syria earthquake: death toll passes 5,000",
+             "A 7.8 magnitude earthquake struck southern Turkey and northern Syria, killing thousands and toppling buildings."),
+            ("Rescuers search rubble after powerful quake hits Turkey and Syria",
+             "Thousands were killed when the magnitude 7.8 earthquake hit the region before dawn."),
+        ],
+        "near_miss": [
+            ("Magnitude 5.1 earthquake shakes Nepal, no casualties reported",
+             "Tremors were felt in Kathmandu and parts of northern India, the seismology centre said."),
+            ("Turkey holds presidential election as economy struggles",
+             "Voters in Turkey cast ballots amid high inflation and a falling lira."),
+        ],
+    },
+]
+
+
+def legacy_is_article_relevant(article, query, text):
+    """The SequenceMatcher-based check this module replaced."""
+    title = (article.get("title") or "").lower()
+    desc = (article.get("description") or "").lower()
+    content = (article.get("content") or "").lower()
+    combined = " ".join([title, desc, content])
+
+    query = query.lower()
+    text = text.lower()
+
+    overlap = sum(1 for w in query.split() if w in combined)
+    ratio = SequenceMatcher(None, text, combined).ratio()
+    return overlap >= 2 or ratio > 0.45
+
+
+def make_text(rng, words):
+    return " ".join(rng.choice(VOCAB) for _ in range(words))
+
+
+def make_articles(rng, count, words):
+    return [{"title": make_text(rng, 12), "description": make_text(rng, 30), "content": make_text(rng, words)}
+            for _ in range(count)]
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def labeled_candidates(form):
+    """
+    Yields (query, text, articles, labels) per case, labels being relevant /
+    near miss / irrelevant. Short claims are their own query, as in extract_keywords().
+    """
+    def article(title, description):
+        return {"title": title, "description": description, "content": description}
+
+    for i, case in enumerate(CASES):
+        pairs = [(article(*a), "relevant") for a in case["relevant"]]
+        pairs += [(article(*a), "near miss") for a in case["near_miss"]]
+        pairs += [(article(*a), "irrelevant") for j, other in enumerate(CASES) if j != i for a in other["relevant"]]
+        if form == "claims":
+            query, text = case["claim"], case["claim"]
+        else:
+            query, text = " AND ".join(case["keywords"].split()), case["text"]
+        yield query, text, [a for a, _ in pairs], [label for _, label in pairs]
+
+
+def accuracy_row(name, labels, predicted):
+    labels, predicted = np.array(labels), np.array(predicted)
+    relevant = labels == "relevant"
+    true_positives = int((predicted & relevant).sum())
+    precision = true_positives / max(int(predicted.sum()), 1)
+    near_miss = predicted[labels == "near miss"]
+    irrelevant = predicted[labels == "irrelevant"]
+    return (f"{name:<20} {true_positives:>4}/{int(relevant.sum()):<4} {int(near_miss.sum()):>6}/{len(near_miss):<4} "
+            f"{int(irrelevant.sum()):>6}/{len(irrelevant):<5} {precision:>9.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, nargs="+", default=[100, 1000, 4000],
+                        help="Input text lengths (words) to benchmark")
+    parser.add_argument("--articles", type=int, default=20)
+    parser.add_argument("--article-words", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Speed only: every synthetic article draws on the same vocabulary, so all of them look relevant
+    rng = random.Random(args.seed)
+    articles = make_articles(rng, args.articles, args.article_words)
+    query = " AND ".join(rng.sample(VOCAB, 5))
+
+    print(f"{'words':>8} {'legacy ms':>12} {'vectorized ms':>15} {'speedup':>9}")
+    for words in args.words:
+        text = make_text(rng, words)
+        legacy_time, _ = timed(lambda: [legacy_is_article_relevant(a, query, text) for a in articles], args.repeat)
+        new_time, _ = timed(lambda: relevant_mask(articles, query, text), args.repeat)
+        print(f"{words:>8} {legacy_time * 1000:>12.1f} {new_time * 1000:>15.2f} {legacy_time / new_time:>8.1f}x")
+
+    for form in ("claims", "messages"):
+        labels, legacy, vectorized, keywords_match, similarity = [], [], [], [], []
+        for query, text, candidates, candidate_labels in labeled_candidates(form):
+            labels += candidate_labels
+            legacy += [legacy_is_article_relevant(a, query, text) for a in candidates]
+            vectorized += relevant_mask(candidates, query, text)
+            scores = relevance_scores(candidates, query, text)
+            keywords_match += list((scores["overlap"] >= RELEVANCE_MIN_OVERLAP)
+                                   & (scores["overlap_share"] >= RELEVANCE_MIN_OVERLAP_SHARE))
+            similarity += list(scores["similarity"])
+        keywords_match, similarity = np.array(keywords_match), np.array(similarity)
+
+        negatives = np.array(labels) != "relevant"
+        agreement = (np.array(legacy) == np.array(vectorized))[negatives].mean()
+        print(f"\n{len(CASES)} labeled {form}, {len(labels)} candidate articles "
+              f"(legacy and vectorized agree on {agreement:.0%} of near misses and irrelevant ones)")
+        print(f"{'':<20} {'relevant':>9} {'near miss':>11} {'irrelevant':>12} {'precision':>9}")
+        print(accuracy_row("legacy", labels, legacy))
+        print(accuracy_row("vectorized", labels, vectorized))
+        print(f"similarity threshold sweep, keyword rule >= {RELEVANCE_MIN_OVERLAP} keywords "
+              f"and >= {RELEVANCE_MIN_OVERLAP_SHARE:.0%} of them (* current):")
+        print(accuracy_row("  keywords only", labels, keywords_match))
+        for threshold in np.arange(0.1, 0.61, 0.05):
+            marker = " *" if abs(threshold - RELEVANCE_SIMILARITY_THRESHOLD) < 1e-9 else ""
+            print(accuracy_row(f"  > {threshold:.2f}{marker}", labels, keywords_match | (similarity > threshold)))
+
+if __name__ == "__main__":
+    main()
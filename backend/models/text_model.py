@@ -2,20 +2,23 @@ from transformers import pipeline, AutoModelForSequenceClassification, AutoToken
 import torch
 import os
 import re
+import time
+import hashlib
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from typing import Dict, List
 from datetime import datetime, timedelta
-from difflib import SequenceMatcher
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-from nltk import word_tokenize, pos_tag
-
-# Ensure resources are available
-nltk.download('punkt', quiet=True)
-nltk.download('wordnet', quiet=True)
-nltk.download('stopwords', quiet=True)
-nltk.download('averaged_perceptron_tagger', quiet=True)
+from models.cache import TTLCache
+from models.batching import MicroBatcher
+from models.domain_index import domain_reputation
+from models.nlp_resources import get_resources
+from models.relevance import relevant_mask, filter_relevant
+from models.news_index import get_news_index
+from models.claim_store import claim_store, CLAIM_STORE_ENABLED, CLAIM_MAX_CHARS
+from models.embeddings import get_encoder
+
 # ----------------------
 # Configuration
 # ----------------------
@@ -23,50 +26,147 @@ DEFAULT_MODEL = os.environ.get(
     "TEXT_MODEL_NAME",
     "hamzab/roberta-fake-news-classification"
 )
+MODEL_REVISION = os.environ.get("TEXT_MODEL_REVISION", "main")
+# Inference backend: "torch" (fp32), "int8" (dynamic quantization) or "onnx" (ONNX Runtime via optimum)
+MODEL_BACKEND = os.environ.get("TEXT_MODEL_BACKEND", "torch").lower()
+ONNX_MODEL_DIR = os.environ.get(
+    "ONNX_MODEL_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx")
+)
 NEWS_API_KEY = os.environ.get("NEWSAPI_KEY")
 GNEWS_API_KEY = os.environ.get("GNEWSAPI_KEY")
+# Per-call timeout and overall deadline (seconds) for trusted-source lookups
+VERIFY_REQUEST_TIMEOUT = float(os.environ.get("VERIFY_REQUEST_TIMEOUT", "5"))
+VERIFY_DEADLINE = float(os.environ.get("VERIFY_DEADLINE", "5"))
+# Comma-separated verification providers: newsapi, gnews and/or local (offline index, see models/news_index.py)
+VERIFY_PROVIDERS = [p.strip() for p in os.environ.get("VERIFY_PROVIDERS", "newsapi,gnews").lower().split(",") if p.strip()]
+# Verification result cache; set VERIFY_CACHE_DB to a file path to persist it across restarts
+VERIFY_CACHE_TTL = float(os.environ.get("VERIFY_CACHE_TTL", "3600"))
+VERIFY_CACHE_SIZE = int(os.environ.get("VERIFY_CACHE_SIZE", "2048"))
+VERIFY_CACHE_DB = os.environ.get("VERIFY_CACHE_DB")
+# End-to-end classify_text result cache
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", "3600"))
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "4096"))
+# Long documents: split into overlapping 512-token windows and combine window scores.
+# CHUNK_MODE is one of mean | max | weighted, or "off" to truncate at 512 characters.
+CHUNK_MODE = os.environ.get("CHUNK_MODE", "mean").lower()
+CHUNK_STRIDE = int(os.environ.get("CHUNK_STRIDE", "64"))
+CHUNK_MAX_WINDOWS = int(os.environ.get("CHUNK_MAX_WINDOWS", "8"))
+# Micro-batching of concurrent single-text model calls
+MICROBATCH_ENABLED = os.environ.get("MICROBATCH_ENABLED", "true").lower() in ("1", "true", "yes")
+MICROBATCH_MAX_SIZE = int(os.environ.get("MICROBATCH_MAX_SIZE", "32"))
+MICROBATCH_MAX_WAIT_MS = float(os.environ.get("MICROBATCH_MAX_WAIT_MS", "10"))
 
-TRUSTED_SOURCES = {
-    'reuters.com', 'apnews.com', 'bbc.com', 'bbc.co.uk',
-    'nytimes.com', 'washingtonpost.com', 'theguardian.com',
-    'wsj.com', 'bloomberg.com', 'npr.org', 'pbs.org',
-    'economist.com', 'ft.com', 'cnn.com', 'nbcnews.com',
-    'cbsnews.com', 'abcnews.go.com', 'usatoday.com',
-    'time.com', 'newsweek.com', 'politico.com', 'axios.com',
-    'thehill.com', 'propublica.org', 'latimes.com',
-    'aljazeera.com', 'dw.com', 'france24.com', 'timesnownews.com',
-    'timesofindia.indiatimes.com','indianexpress.com', 'firstpost.com','altnews.in',
-    'ddnews.gov.in','msn.com'
-}
 
 NEGATIONS = {"not", "no", "never", "none", "cannot", "can't", "don't", "doesn't", "isn't", "wasn't", "won't", "shouldn't", "couldn't", "didn't"}
 
 classifier = None
 tokenizer = None
 model = None
+model_lock = threading.Lock()
+model_status = {"ready": False, "loading": False, "error": None, "load_seconds": None}
+
+# Shared keep-alive session and worker pool for news provider lookups
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+verify_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="verify")
+
+verification_cache = TTLCache(maxsize=VERIFY_CACHE_SIZE, ttl=VERIFY_CACHE_TTL,
+                              db_path=VERIFY_CACHE_DB, name="verification")
+result_cache = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL, name="classification")
 
 # ----------------------
 # Helper Functions
 # ----------------------
+def build_classifier(backend: str = MODEL_BACKEND):
+    """
+    Builds the text-classification pipeline for the given backend.
+    All backends return the same pipeline output, so label mapping is unchanged.
+    """
+    tok = AutoTokenizer.from_pretrained(DEFAULT_MODEL, revision=MODEL_REVISION)
+    device = 0 if torch.cuda.is_available() else -1
+
+    if backend == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+        except ImportError:
+            print("optimum[onnxruntime] is not installed, falling back to the torch backend")
+            return build_classifier("torch")
+        export_dir = os.path.join(ONNX_MODEL_DIR, DEFAULT_MODEL.replace("/", "__"), MODEL_REVISION)
+        if os.path.exists(os.path.join(export_dir, "model.onnx")):
+            mdl = ORTModelForSequenceClassification.from_pretrained(export_dir)
+        else:
+            # First run exports the checkpoint to ONNX and keeps it for next time
+            mdl = ORTModelForSequenceClassification.from_pretrained(DEFAULT_MODEL, revision=MODEL_REVISION, export=True)
+            mdl.save_pretrained(export_dir)
+            tok.save_pretrained(export_dir)
+        device = -1
+    else:
+        mdl = AutoModelForSequenceClassification.from_pretrained(DEFAULT_MODEL, revision=MODEL_REVISION)
+        if backend == "int8":
+            # Dynamic INT8 quantization of the Linear layers only runs on CPU
+            mdl = torch.quantization.quantize_dynamic(mdl, {torch.nn.Linear}, dtype=torch.qint8)
+            device = -1
+        elif backend != "torch":
+            print(f"Unknown TEXT_MODEL_BACKEND '{backend}', using torch")
+        mdl.eval()
+
+    clf = pipeline(
+        "text-classification",
+        model=mdl,
+        tokenizer=tok,
+        device=device,
+        truncation=True,
+        max_length=512
+    )
+    return tok, mdl, clf
+
 def get_classifier():
     global classifier, tokenizer, model
-    if classifier is None:
-        try:
-            tokenizer = AutoTokenizer.from_pretrained(DEFAULT_MODEL)
-            model = AutoModelForSequenceClassification.from_pretrained(DEFAULT_MODEL)
-            classifier = pipeline(
-                "text-classification",
-                model=model,
-                tokenizer=tokenizer,
-                device=0 if torch.cuda.is_available() else -1,
-                truncation=True,
-                max_length=512
-            )
-        except Exception as e:
-            print(f"HF model load failed, classifier will be None. Error: {e}")
-            classifier = None
+    if classifier is not None:
+        return classifier
+    # Only one thread loads the model; the rest wait and reuse it
+    with model_lock:
+        if classifier is None:
+            model_status["loading"] = True
+            started = time.monotonic()
+            try:
+                tokenizer, model, classifier = build_classifier(MODEL_BACKEND)
+                model_status["ready"] = True
+                model_status["error"] = None
+                model_status["load_seconds"] = round(time.monotonic() - started, 2)
+            except Exception as e:
+                print(f"HF model load failed, classifier will be None. Error: {e}")
+                classifier = None
+                model_status["error"] = str(e)
+            finally:
+                model_status["loading"] = False
     return classifier
 
+def warmup() -> bool:
+    """
+    Loads the model and runs a dummy inference so the first real request
+    doesn't pay for weight loading and buffer allocation.
+    """
+    get_resources()
+    if "local" in VERIFY_PROVIDERS:
+        get_news_index()
+    if CLAIM_STORE_ENABLED:
+        get_encoder()
+    clf = get_classifier()
+    if clf is None:
+        return False
+    try:
+        clf(["Warmup request for the fake news classifier."], batch_size=1)
+        return True
+    except Exception as e:
+        print(f"Model warmup failed: {e}")
+        model_status["error"] = str(e)
+        return False
+
+def get_model_status() -> Dict:
+    return dict(model_status, model=DEFAULT_MODEL, revision=MODEL_REVISION, backend=MODEL_BACKEND)
+
 def preprocess_text(text: str) -> str:
     text = re.sub(r'http\S+|www\S+', '', text)
     text = re.sub(r'\s+', ' ', text).strip()
@@ -79,23 +179,25 @@ def extract_keywords(text: str) -> str:
     Otherwise, extracts top noun phrases and entities for news search.
     """
     text = text.strip()
-    words = word_tokenize(text)
+    nlp = get_resources()
+    if nlp is None:
+        return text
+
+    # Only a bounded prefix is tokenized and tagged; keywords come from the start anyway
+    words = nlp.tokenize(text)
     if len(words) <= 15:
         # For short input (like one-sentence claims), use entire text
         return text
 
-    stop_words = set(stopwords.words('english'))
-    lemmatizer = WordNetLemmatizer()
-
     # POS tagging to identify nouns and proper nouns
-    tagged = pos_tag(words)
+    tagged = nlp.tag(words)
     keywords = []
     for word, tag in tagged:
         word_lower = word.lower()
-        if word_lower.isalpha() and word_lower not in stop_words:
+        if word_lower.isalpha() and word_lower not in nlp.stop_words:
             # Nouns and proper nouns are prioritized
             if tag.startswith('NN') or tag.startswith('JJ'):
-                keywords.append(lemmatizer.lemmatize(word_lower))
+                keywords.append(nlp.lemmatize(word_lower))
 
     # Deduplicate & limit to 5–7 most relevant keywords
     unique_keywords = list(dict.fromkeys(keywords))[:7]
@@ -111,25 +213,19 @@ def extract_keywords(text: str) -> str:
 def is_article_relevant(article, query, text):
     """
     Checks if an article is contextually relevant to the input query/text.
-    Uses keyword overlap and fuzzy text similarity.
+    Uses keyword overlap and TF-IDF similarity (see models/relevance.py).
     """
-    title = (article.get("title") or "").lower()
-    desc = (article.get("description") or "").lower()
-    content = (article.get("content") or "").lower()
-    combined = " ".join([title, desc, content])
-
-    query = query.lower()
-    text = text.lower()
-
-    overlap = sum(1 for w in query.split() if w in combined)
-    ratio = SequenceMatcher(None, text, combined).ratio()
-
-    # At least 2 keyword overlaps or >0.45 similarity means it's relevant
-    return overlap >= 2 or ratio > 0.45
+    return relevant_mask([article], query, text)[0]
 
 # ----------------------
 # NewsAPI & GNews Search
 # ----------------------
+def provider_error(name: str, response, data) -> Dict:
+    # Rate limits, bad keys and outages: reported as errors so the answer isn't cached as "nothing found"
+    message = (data.get('message') or data.get('errors')) if isinstance(data, dict) else None
+    return {"found": False, "sources": [], "error": True,
+            "note": f"{name} returned HTTP {response.status_code}: {message or response.reason}"}
+
 def search_newsapi(query: str, full_text: str) -> Dict:
     if not NEWS_API_KEY:
         return {"found": False, "sources": [], "note": "No NewsAPI key"}
@@ -144,13 +240,15 @@ def search_newsapi(query: str, full_text: str) -> Dict:
         'apiKey': NEWS_API_KEY
     }
     try:
-        response = requests.get(url, params=params, timeout=5)
+        response = http_session.get(url, params=params, timeout=VERIFY_REQUEST_TIMEOUT)
         data = response.json()
+        if not response.ok or data.get('status') != 'ok':
+            return provider_error("NewsAPI", response, data)
         articles = data.get('articles', [])
-        trusted_articles = [a for a in articles if any(domain in a.get('url', '') for domain in TRUSTED_SOURCES)]
+        trusted_articles = [a for a in articles if domain_reputation.is_search_source(a.get('url') or '')]
 
         # Filter only relevant ones
-        relevant_articles = [a for a in trusted_articles if is_article_relevant(a, query, full_text)]
+        relevant_articles = filter_relevant(trusted_articles, query, full_text)
 
         if relevant_articles:
             return {
@@ -161,7 +259,7 @@ def search_newsapi(query: str, full_text: str) -> Dict:
             }
         return {"found": False, "sources": [], "note": "No relevant trusted articles found"}
     except Exception as e:
-        return {"found": False, "sources": [], "note": f"NewsAPI request failed: {str(e)}"}
+        return {"found": False, "sources": [], "error": True, "note": f"NewsAPI request failed: {str(e)}"}
 
 def search_gnews(query: str, full_text: str) -> Dict:
     if not GNEWS_API_KEY:
@@ -174,12 +272,14 @@ def search_gnews(query: str, full_text: str) -> Dict:
         'apikey': GNEWS_API_KEY
     }
     try:
-        response = requests.get(url, params=params, timeout=5)
+        response = http_session.get(url, params=params, timeout=VERIFY_REQUEST_TIMEOUT)
         data = response.json()
+        if not response.ok or data.get('errors'):
+            return provider_error("GNews", response, data)
         articles = data.get('articles', [])
-        trusted_articles = [a for a in articles if any(domain in a.get('url', '') for domain in TRUSTED_SOURCES)]
+        trusted_articles = [a for a in articles if domain_reputation.is_search_source(a.get('url') or '')]
 
-        relevant_articles = [a for a in trusted_articles if is_article_relevant(a, query, full_text)]
+        relevant_articles = filter_relevant(trusted_articles, query, full_text)
 
         if relevant_articles:
             return {
@@ -190,38 +290,120 @@ def search_gnews(query: str, full_text: str) -> Dict:
             }
         return {"found": False, "sources": [], "note": "No relevant trusted articles found"}
     except Exception as e:
-        return {"found": False, "sources": [], "note": f"GNews request failed: {str(e)}"}
+        return {"found": False, "sources": [], "error": True, "note": f"GNews request failed: {str(e)}"}
+
+def search_local(query: str, full_text: str) -> Dict:
+    index = get_news_index()
+    if index is None:
+        return {"found": False, "sources": [], "note": "No local news index"}
+    try:
+        articles = [{"title": d["title"], "content": d["text"], "url": d["url"], "source": d["source"],
+                     "published": d["published"]} for d in index.search(query, full_text, k=10)]
+
+        relevant_articles = filter_relevant(articles, query, full_text)
+
+        if relevant_articles:
+            return {
+                "found": True,
+                "count": len(relevant_articles),
+                "sources": [{"title": a['title'], "source": a['source'], "url": a['url'],
+                             "published": a['published']} for a in relevant_articles[:5]]
+            }
+        return {"found": False, "sources": [], "note": "No relevant articles in local index"}
+    except Exception as e:
+        return {"found": False, "sources": [], "error": True, "note": f"Local index search failed: {str(e)}"}
+
+SEARCH_PROVIDERS = {"newsapi": search_newsapi, "gnews": search_gnews, "local": search_local}
+for name in VERIFY_PROVIDERS:
+    if name not in SEARCH_PROVIDERS:
+        print(f"Unknown verification provider '{name}' ignored (expected one of {', '.join(SEARCH_PROVIDERS)})")
 
 # ----------------------
 # Verification
 # ----------------------
+def normalize_query(query: str) -> str:
+    return re.sub(r'\s+', ' ', query.lower()).strip()
+
 def verify_with_trusted_sources(text: str) -> Dict:
-    query = extract_keywords(text)
+    return verify_many([text])[0]
+
+def verify_many(texts: List[str]) -> List[Dict]:
+    """
+    Verification results for several texts, in order. The provider searches
+    of every uncached text run together on verify_executor under one shared
+    deadline, so a batch waits about as long as one text rather than the sum.
+    Results cut short by the deadline or a provider error have "complete": False.
+    """
+    queries = [extract_keywords(text) for text in texts]
+    cache_keys = [normalize_query(query) for query in queries]
+    results = [verification_cache.get(key) for key in cache_keys]
+
+    searches = {}
+    for j, (query, key) in enumerate(zip(queries, cache_keys)):
+        if results[j] is None and key not in searches:
+            searches[key] = (query, start_searches(query, texts[j]))
+    deadline = time.monotonic() + VERIFY_DEADLINE
+    verified = {}
+    for key, (query, futures) in searches.items():
+        result, complete = _verify_query(query, futures, deadline)
+        # Don't remember answers cut short by the deadline or a provider error,
+        # and flag them so results built on them aren't cached either
+        if complete:
+            verification_cache.set(key, result)
+        else:
+            result["complete"] = False
+        verified[key] = result
+    return [result if result is not None else verified[key] for result, key in zip(results, cache_keys)]
+
+def start_searches(query: str, text: str) -> Dict:
+    """Submits the query to every configured provider; maps each future to its provider rank."""
+    providers = [SEARCH_PROVIDERS[name] for name in VERIFY_PROVIDERS if name in SEARCH_PROVIDERS]
+    return {verify_executor.submit(search, query, text): rank for rank, search in enumerate(providers)}
+
+def _verify_query(query: str, futures: Dict, deadline: float) -> (Dict, bool):
     total_sources = 0
     verification_details = []
 
-    news_result = search_newsapi(query, text)
-    if news_result.get("found"):
-        total_sources += news_result.get("count", 0)
-        verification_details.append({"query": query, "sources_found": news_result.get("count", 0), "top_sources": news_result.get("sources", [])[:2]})
-
-    if total_sources < 2:
-        gnews_result = search_gnews(query, text)
-        if gnews_result.get("found"):
-            total_sources += gnews_result.get("count", 0)
-            verification_details.append({"query": query, "sources_found": gnews_result.get("count", 0), "top_sources": gnews_result.get("sources", [])[:2]})
+    # Providers were all queried at once; stop waiting once enough sources are in or the deadline passes
+    results = {}
+    pending = set(futures)
+    complete = True
+    while pending and total_sources < 2:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            complete = False
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"found": False, "sources": [], "error": True, "note": str(e)}
+            results[futures[future]] = result
+            if result.get("error"):
+                # A provider that failed might have found sources; don't cache this answer
+                complete = False
+            if result.get("found"):
+                total_sources += result.get("count", 0)
+    for future in pending:
+        future.cancel()
+
+    for rank in sorted(results):
+        result = results[rank]
+        if result.get("found"):
+            verification_details.append({"query": query, "sources_found": result.get("count", 0), "top_sources": result.get("sources", [])[:2]})
 
     if total_sources >= 3:
-        return {"verified": True, "confidence": min(0.6 + total_sources*0.05, 0.9),
+        return ({"verified": True, "confidence": min(0.6 + total_sources*0.05, 0.9),
                 "reason": f"Corroborated by {total_sources} relevant trusted sources",
-                "trusted_sources_found": total_sources, "verification_details": verification_details}
+                "trusted_sources_found": total_sources, "verification_details": verification_details}, complete)
     elif total_sources >= 1:
-        return {"verified": True, "confidence": 0.6,
+        return ({"verified": True, "confidence": 0.6,
                 "reason": f"Partially verified by {total_sources} relevant source(s)",
-                "trusted_sources_found": total_sources, "verification_details": verification_details}
+                "trusted_sources_found": total_sources, "verification_details": verification_details}, complete)
     else:
-        return {"verified": False, "confidence": 0.4,
-                "reason": "No relevant trusted sources found", "trusted_sources_found": 0}
+        return ({"verified": False, "confidence": 0.4,
+                "reason": "No relevant trusted sources found", "trusted_sources_found": 0}, complete)
 
 # ----------------------
 # Content Features & Authenticity
@@ -260,64 +442,155 @@ def remove_negations(text: str) -> (str, bool):
 # ----------------------
 # Main Classification
 # ----------------------
-def classify_text(text: str, return_details: bool = False) -> Dict:
-    processed_text, negation_present = remove_negations(preprocess_text(text))
+def prepare_text(text: str) -> (str, bool):
+    """Preprocesses text and strips negations, as fed to the model."""
+    return remove_negations(preprocess_text(text))
 
-    verification_result = verify_with_trusted_sources(processed_text)
+def run_model(texts: List[str], batch_size: int = 8) -> List[Dict]:
+    """
+    Runs the classifier over many texts at once.
+    Texts are sorted by length so each padded batch holds similar-sized
+    sequences, then results are mapped back to the original order.
+    Returns None if the model is unavailable.
+    """
+    clf = get_classifier()
+    if not clf:
+        return None
+    if not texts:
+        return []
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    sorted_texts = [texts[i][:512] for i in order]
+    outputs = clf(sorted_texts, batch_size=batch_size)
+    results = [None] * len(texts)
+    for idx, output in zip(order, outputs):
+        results[idx] = output[0] if isinstance(output, list) else output
+    return results
+
+inference_batcher = MicroBatcher(
+    lambda texts: run_model(texts, batch_size=len(texts)),
+    max_batch_size=MICROBATCH_MAX_SIZE,
+    max_wait=MICROBATCH_MAX_WAIT_MS / 1000.0,
+    name="inference-batcher"
+)
+
+def infer_one(text: str) -> Dict:
+    """
+    Runs the model on one text. With micro-batching enabled, the call is
+    merged with other concurrent requests into a single forward pass.
+    """
+    if MICROBATCH_ENABLED:
+        return inference_batcher(text)
+    outputs = run_model([text], batch_size=1)
+    return outputs[0] if outputs else None
+
+def needs_chunking(text: str) -> bool:
+    # Anything up to 512 characters fits in one 512-token window
+    return CHUNK_MODE != "off" and len(text) > 512
+
+def classify_document(text: str) -> Dict:
+    """
+    Classifies a long document. The text is tokenized once into overlapping
+    512-token windows, all windows run as one batch, and window probabilities
+    are combined according to CHUNK_MODE. Returns a pipeline-style
+    {"label", "score"} dict, or None if the model is unavailable.
+    """
+    if get_classifier() is None:
+        return None
+
+    encoded = tokenizer(
+        text,
+        truncation=True,
+        max_length=512,
+        stride=CHUNK_STRIDE,
+        return_overflowing_tokens=True,
+        padding=True,
+        return_tensors="pt"
+    )
+    input_ids = encoded["input_ids"]
+    attention_mask = encoded["attention_mask"]
+    total_windows = input_ids.shape[0]
+    if total_windows > CHUNK_MAX_WINDOWS:
+        # Keep windows spread evenly over the document to bound latency
+        keep = torch.linspace(0, total_windows - 1, CHUNK_MAX_WINDOWS).round().long().unique()
+        input_ids, attention_mask = input_ids[keep], attention_mask[keep]
+
+    device = getattr(model, "device", "cpu")
+    with torch.no_grad():
+        logits = model(input_ids=input_ids.to(device), attention_mask=attention_mask.to(device)).logits
+    probs = torch.softmax(logits.float(), dim=-1).cpu()
+
+    if CHUNK_MODE == "max":
+        # Use the window the model is most sure about
+        doc_probs = probs[probs.max(dim=-1).values.argmax()]
+    elif CHUNK_MODE == "weighted":
+        # Weight windows by their length and the model's confidence in them
+        weights = attention_mask.sum(dim=-1).float() * probs.max(dim=-1).values
+        doc_probs = (probs * (weights / weights.sum()).unsqueeze(-1)).sum(dim=0)
+    else:
+        doc_probs = probs.mean(dim=0)
+
+    label_id = int(doc_probs.argmax())
+    return {
+        "label": model.config.id2label.get(label_id, f"LABEL_{label_id}"),
+        "score": float(doc_probs[label_id]),
+        "windows": int(input_ids.shape[0]),
+        "total_windows": int(total_windows)
+    }
+
+def build_result(model_output: Dict, processed_text: str, negation_present: bool,
+                 verification_result: Dict, return_details: bool = False) -> Dict:
+    """Combines a raw model output with source verification into the final result dict."""
     verified_sources = verification_result.get("trusted_sources_found", 0)
+    label = model_output.get("label", "").upper()
+    raw_score = model_output.get("score", 0.0)
+    prediction = "FAKE" if label in ("FAKE", "LABEL_0", "NEGATIVE", "UNRELIABLE") else "REAL"
+
+    authenticity_score = calculate_authenticity_score(raw_score, verification_result)
+
+    if prediction == "FAKE":
+        if verified_sources >= 3 and authenticity_score > 0.85:
+            final_prediction = "REAL"
+        else:
+            final_prediction = "FAKE"
+    elif prediction == "REAL":
+        if verified_sources >= 2 or authenticity_score >= 0.6999:
+            final_prediction = "REAL"
+        else:
+            final_prediction = "FAKE"
+    else:
+        final_prediction = "UNCERTAIN"
+
+    # Flip prediction if negation detected
+    if negation_present:
+        if final_prediction == "FAKE":
+            final_prediction = "REAL"
+        elif final_prediction == "REAL":
+            final_prediction = "FAKE"
+
+    confidence_level = "high" if authenticity_score > 0.85 else "medium" if authenticity_score >= 0.55 else "low"
+
+    result_dict = {
+        "prediction": final_prediction,
+        "confidence": confidence_level,
+        "authenticity_score": float(authenticity_score),
+        "model_prediction": prediction,
+        "model_score": float(raw_score),
+        "source_verification": verification_result
+    }
 
-    clf = get_classifier()
-    if clf:
-        try:
-            result = clf(processed_text[:512])[0]
-            label = result.get("label", "").upper()
-            raw_score = result.get("score", 0.0)
-            prediction = "FAKE" if label in ("FAKE", "LABEL_0", "NEGATIVE", "UNRELIABLE") else "REAL"
-
-            authenticity_score = calculate_authenticity_score(raw_score, verification_result)
-
-            if prediction == "FAKE":
-                if verified_sources >= 3 and authenticity_score > 0.85:
-                    final_prediction = "REAL"
-                else:
-                    final_prediction = "FAKE"
-            elif prediction == "REAL":
-                if verified_sources >= 2 or authenticity_score >= 0.6999:
-                    final_prediction = "REAL"
-                else:
-                    final_prediction = "FAKE"
-            else:
-                final_prediction = "UNCERTAIN"
-
-            # Flip prediction if negation detected
-            if negation_present:
-                if final_prediction == "FAKE":
-                    final_prediction = "REAL"
-                elif final_prediction == "REAL":
-                    final_prediction = "FAKE"
-
-            confidence_level = "high" if authenticity_score > 0.85 else "medium" if authenticity_score >= 0.55 else "low"
-
-            result_dict = {
-                "prediction": final_prediction,
-                "confidence": confidence_level,
-                "authenticity_score": float(authenticity_score),
-                "model_prediction": prediction,
-                "model_score": float(raw_score),
-                "source_verification": verification_result
-            }
+    if "windows" in model_output:
+        result_dict["windows_classified"] = model_output["windows"]
 
-            if return_details:
-                result_dict["content_quality"] = extract_content_features(processed_text)
-                result_dict["verification_details"] = verification_result.get("verification_details", [])
+    if return_details:
+        result_dict["content_quality"] = extract_content_features(processed_text)
+        result_dict["verification_details"] = verification_result.get("verification_details", [])
 
-            if negation_present:
-                result_dict["note"] = result_dict.get("note", "") + " | Negation detected and prediction flipped"
+    if negation_present:
+        result_dict["note"] = result_dict.get("note", "") + " | Negation detected and prediction flipped"
 
-            return result_dict
-        except Exception as e:
-            print(f"Classification error: {e}")
+    return result_dict
 
+def unavailable_result(verification_result: Dict) -> Dict:
     return {
         "prediction": "UNCERTAIN",
         "score": verification_result.get("confidence", 0.4),
@@ -325,10 +598,166 @@ def classify_text(text: str, return_details: bool = False) -> Dict:
         "note": "Model unavailable"
     }
 
-def classify_batch(texts: List[str], batch_size: int = 8) -> List[Dict]:
-    results = []
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i+batch_size]
-        for text in batch:
-            results.append(classify_text(text))
+def result_cache_key(processed_text: str, negation_present: bool, return_details: bool = False) -> str:
+    """Hash of the model identity plus the preprocessed text."""
+    raw = "\0".join([DEFAULT_MODEL, MODEL_REVISION, MODEL_BACKEND, str(bool(negation_present)),
+                      str(bool(return_details)), processed_text])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def invalidate_result_cache(text: str = None) -> None:
+    """
+    Drops cached classification results: all of them, or only those for
+    `text`, including claim-store entries close enough to be served for it.
+    Call with no arguments after changing TEXT_MODEL_NAME or the model revision.
+    """
+    if text is None:
+        result_cache.clear()
+        claim_store.clear()
+        return
+    processed_text, negation_present = prepare_text(text)
+    for details in (False, True):
+        result_cache.delete(result_cache_key(processed_text, negation_present, details))
+    claim_vector = embed_claims([processed_text])[0]
+    if claim_vector is not None:
+        claim_store.remove(claim_vector)
+
+# ----------------------
+# Semantic claim matching
+# ----------------------
+def claim_group(negation_present: bool, return_details: bool) -> int:
+    # A negated paraphrase must never reuse the verdict of the original claim
+    return int(bool(negation_present)) * 2 + int(bool(return_details))
+
+def embed_claims(processed_texts: List[str]) -> List:
+    """Claim-store vectors for claim-sized texts; None for the rest or if the encoder is unavailable."""
+    vectors = [None] * len(processed_texts)
+    eligible = [j for j, t in enumerate(processed_texts) if len(t) <= CLAIM_MAX_CHARS]
+    if not eligible:
+        return vectors
+    try:
+        encoded = claim_store.embed([processed_texts[j] for j in eligible])
+    except Exception as e:
+        print(f"Claim embedding failed: {e}")
+        encoded = None
+    if encoded is not None:
+        for j, vector in zip(eligible, encoded):
+            vectors[j] = vector
+    return vectors
+
+def matched_claim_result(vector, processed_text: str, negation_present: bool, return_details: bool) -> Dict:
+    """Stored result of a previously checked paraphrase, with the match distance, or None."""
+    if vector is None:
+        return None
+    match = claim_store.search(vector, claim_group(negation_present, return_details), text=processed_text)
+    if match is None:
+        return None
+    result = dict(match["value"])
+    result["claim_match"] = {"distance": match["distance"], "matched_claim": match["text"][:200]}
+    return result
+
+def remember_claim(vector, processed_text: str, negation_present: bool, return_details: bool, result: Dict) -> None:
+    if vector is not None:
+        claim_store.add(vector, processed_text, result, claim_group(negation_present, return_details))
+
+def is_reusable_result(result) -> bool:
+    """
+    True if a classification may be cached and served again: the model ran
+    and source verification wasn't cut short by a provider error or the deadline.
+    """
+    return isinstance(result, dict) and result.get("prediction") in ("REAL", "FAKE") and "error" not in result \
+        and (result.get("source_verification") or {}).get("complete", True)
+
+def remember_result(cache_key: str, vector, processed_text: str, negation_present: bool, return_details: bool,
+                    result: Dict) -> None:
+    if is_reusable_result(result):
+        result_cache.set(cache_key, result)
+        remember_claim(vector, processed_text, negation_present, return_details, result)
+
+def classify_text(text: str, return_details: bool = False) -> Dict:
+    processed_text, negation_present = prepare_text(text)
+
+    cache_key = result_cache_key(processed_text, negation_present, return_details)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return dict(cached)
+
+    # Paraphrases of claims already checked skip verification and inference
+    claim_vector = embed_claims([processed_text])[0]
+    matched = matched_claim_result(claim_vector, processed_text, negation_present, return_details)
+    if matched is not None:
+        return matched
+
+    verification_result = verify_with_trusted_sources(processed_text)
+
+    try:
+        if needs_chunking(processed_text):
+            output = classify_document(processed_text)
+        else:
+            output = infer_one(processed_text)
+        if output:
+            result = build_result(output, processed_text, negation_present,
+                                  verification_result, return_details)
+            remember_result(cache_key, claim_vector, processed_text, negation_present, return_details, result)
+            return dict(result)
+    except Exception as e:
+        print(f"Classification error: {e}")
+
+    return unavailable_result(verification_result)
+
+def classify_batch(texts: List[str], batch_size: int = 8, return_details: bool = False) -> List[Dict]:
+    """
+    Classifies many texts with one padded forward pass per batch.
+    Cached texts and paraphrases of checked claims are answered directly;
+    results come back in input order.
+    """
+    results = [None] * len(texts)
+    uncached = []
+    for i, text in enumerate(texts):
+        processed, negation_present = prepare_text(text)
+        cache_key = result_cache_key(processed, negation_present, return_details)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            results[i] = dict(cached)
+        else:
+            uncached.append((i, processed, negation_present, cache_key))
+
+    pending = []
+    claim_vectors = {}
+    vectors = embed_claims([processed for _, processed, _, _ in uncached])
+    for item, vector in zip(uncached, vectors):
+        i, processed, negation_present, _ = item
+        matched = matched_claim_result(vector, processed, negation_present, return_details)
+        if matched is not None:
+            results[i] = matched
+        else:
+            claim_vectors[i] = vector
+            pending.append(item)
+
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start+batch_size]
+        verifications = verify_many([processed for _, processed, _, _ in batch])
+
+        outputs = None
+        try:
+            short = [j for j, item in enumerate(batch) if not needs_chunking(item[1])]
+            long_docs = [j for j, item in enumerate(batch) if needs_chunking(item[1])]
+            outputs = [None] * len(batch)
+            short_outputs = run_model([batch[j][1] for j in short], batch_size=batch_size)
+            if short_outputs is not None:
+                for j, output in zip(short, short_outputs):
+                    outputs[j] = output
+                for j in long_docs:
+                    outputs[j] = classify_document(batch[j][1])
+        except Exception as e:
+            print(f"Batch classification error: {e}")
+
+        for (i, processed, negation_present, cache_key), verification_result, output in zip(
+                batch, verifications, outputs or [None] * len(batch)):
+            if output is None:
+                results[i] = unavailable_result(verification_result)
+            else:
+                result = build_result(output, processed, negation_present,
+                                      verification_result, return_details)
+                remember_result(cache_key, claim_vectors[i], processed, negation_present, return_details, result)
+                results[i] = dict(result)
     return results
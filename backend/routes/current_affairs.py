@@ -1,36 +1,129 @@
 from flask import Blueprint, jsonify
 from newspaper import Article, Source, Config
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import os
+import time
+import threading
 from config import NEWSAPI_KEY
 
 news_bp = Blueprint("news", __name__)
 
+# Snapshot refresh settings
+NEWS_REFRESH_INTERVAL = float(os.getenv("NEWS_REFRESH_INTERVAL", "300"))
+NEWS_REQUEST_TIMEOUT = float(os.getenv("NEWS_REQUEST_TIMEOUT", "10"))
+NEWS_WORKERS = int(os.getenv("NEWS_WORKERS", "8"))
+# While there is no feed at all, a failed build is retried on request at most this often
+NEWS_RETRY_INTERVAL = float(os.getenv("NEWS_RETRY_INTERVAL", "60"))
+
+FALLBACK_SOURCES = [
+    "https://www.bbc.com/news",
+    "https://www.reuters.com/world/",
+    "https://www.theguardian.com/international"
+]
+ARTICLES_PER_SOURCE = 5
+
+# Latest feed, swapped in whole by the refresher so readers never see a partial one,
+# plus when the last refresh attempt finished and why it failed (if it did)
+snapshot = {"data": None, "updated_at": 0.0, "attempted_at": 0.0, "error": None}
+refresh_lock = threading.Lock()
+first_attempt = threading.Event()
+refresher_thread = None
+
 @news_bp.route("/top", methods=["GET"])
 def top_news():
+    # Serve the latest snapshot; if it's stale, kick off a refresh and still answer right away
+    data = snapshot["data"]
+    if data is None:
+        if not snapshot["attempted_at"] and not refresh_lock.locked():
+            # Nothing tried yet: build the first feed and give it a moment
+            trigger_refresh()
+            first_attempt.wait(timeout=NEWS_REQUEST_TIMEOUT * 2)
+            data = snapshot["data"]
+        elif snapshot["error"] and time.time() - snapshot["attempted_at"] > NEWS_RETRY_INTERVAL:
+            trigger_refresh()
+        # A build is running or the last one failed: answer now rather than tie up a worker
+        if data is None:
+            note = "News feed is unavailable right now" if snapshot["error"] else "News feed is still loading"
+            return jsonify({"articles": [], "note": note}), 503
+    elif time.time() - snapshot["updated_at"] > NEWS_REFRESH_INTERVAL:
+        trigger_refresh()
+    return jsonify(data)
+
+# --------------------------
+# Feed building
+# --------------------------
+def build_feed():
     # If you have NEWSAPI_KEY, use NewsAPI. Fallback to scraping a few news sites with newspaper3k.
     if NEWSAPI_KEY:
         url = f"https://newsapi.org/v2/top-headlines?language=en&pageSize=20&apiKey={NEWSAPI_KEY}"
-        r = requests.get(url)
-        return jsonify(r.json())
-    # fallback: scrape a few sources
-    sources = [
-        "https://www.bbc.com/news",
-        "https://www.reuters.com/world/",
-        "https://www.theguardian.com/international"
-    ]
-    articles = []
-    for s in sources:
-        try:
-            src = Source(s)
-            src.download()
-            src.parse()
-            for art in src.articles[:5]:
-                try:
-                    art.download(); art.parse()
-                    articles.append({"title": art.title, "text": art.text[:200], "url": art.url})
-                except Exception:
-                    continue
-        except Exception:
-            continue
-    return jsonify({"articles": articles})
+        r = requests.get(url, timeout=NEWS_REQUEST_TIMEOUT)
+        payload = r.json() if r.headers.get("Content-Type", "").startswith("application/json") else {}
+        # Error payloads (bad key, rate limit) must not replace a good snapshot
+        if not r.ok or payload.get("status") != "ok":
+            raise RuntimeError(f"NewsAPI returned HTTP {r.status_code}: {payload.get('message', r.reason)}")
+        return payload
+    return {"articles": scrape_sources(FALLBACK_SOURCES)}
+
+def scrape_sources(sources):
+    config = Config()
+    config.request_timeout = NEWS_REQUEST_TIMEOUT
+    config.memoize_articles = False
+
+    with ThreadPoolExecutor(max_workers=NEWS_WORKERS) as pool:
+        built = list(pool.map(lambda s: build_source(s, config), sources))
+        candidates = [art for arts in built for art in arts]
+        downloaded = pool.map(download_article, candidates)
+        return [a for a in downloaded if a]
+
+def build_source(url, config):
+    try:
+        src = Source(url, config=config)
+        src.download()
+        src.parse()
+        return src.articles[:ARTICLES_PER_SOURCE]
+    except Exception:
+        return []
+
+def download_article(art):
+    try:
+        art.download(); art.parse()
+        return {"title": art.title, "text": art.text[:200], "url": art.url}
+    except Exception:
+        return None
+
+# --------------------------
+# Background refresh
+# --------------------------
+def refresh_feed():
+    # Only one refresh at a time; concurrent callers just keep serving the old snapshot
+    if not refresh_lock.acquire(blocking=False):
+        return
+    try:
+        data = build_feed()
+        snapshot.update(data=data, updated_at=time.time(), error=None)
+    except Exception as e:
+        print(f"News feed refresh failed, keeping previous snapshot: {e}")
+        snapshot["error"] = str(e)
+    finally:
+        snapshot["attempted_at"] = time.time()
+        first_attempt.set()
+        refresh_lock.release()
+
+def trigger_refresh():
+    if not refresh_lock.locked():
+        threading.Thread(target=refresh_feed, name="news-refresh", daemon=True).start()
+
+def start_news_refresher():
+    """Starts the scheduler that rebuilds the feed every NEWS_REFRESH_INTERVAL seconds."""
+    global refresher_thread
+    if refresher_thread is not None:
+        return
+
+    def loop():
+        while True:
+            refresh_feed()
+            time.sleep(NEWS_REFRESH_INTERVAL)
+
+    refresher_thread = threading.Thread(target=loop, name="news-refresher", daemon=True)
+    refresher_thread.start()
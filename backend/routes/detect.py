@@ -1,7 +1,10 @@
-from flask import Blueprint, request, jsonify
-from models.text_model import classify_text
-from routes.utils import allowed_file, save_file
-import os, cloudinary, cloudinary.uploader
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from models.text_model import classify_text, classify_batch
+from routes.utils import allowed_file, read_upload
+from models.image_index import image_hash, detect_image_index
+from models.forensics import analyze_image
+import os, json, time, itertools, threading, cloudinary, cloudinary.uploader
+from concurrent.futures import ThreadPoolExecutor, wait
 from serpapi.google_search import GoogleSearch  # Make sure serpapi 2.x is installed
 from dotenv import load_dotenv
 
@@ -11,6 +14,13 @@ CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME")
 CLOUD_KEY = os.getenv("CLOUDINARY_API_KEY")
 CLOUD_SECRET = os.getenv("CLOUDINARY_API_SECRET")
 SERPAPI_KEY = os.getenv("SERPAPI_KEY","d7448f57698bdac1b865377899c08d67e184d8f3d2b8aa0fe13445e49570dcef")
+BATCH_SIZE = int(os.getenv("DETECT_BATCH_SIZE", "16"))
+# Overall time budget for /image; stages still running at the deadline are reported as timed out
+IMAGE_DETECT_DEADLINE = float(os.getenv("IMAGE_DETECT_DEADLINE", "20"))
+CLOUDINARY_TIMEOUT = float(os.getenv("CLOUDINARY_TIMEOUT", "15"))
+SERPAPI_TIMEOUT = float(os.getenv("SERPAPI_TIMEOUT", "15"))
+
+stage_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="image-stage")
 
 # =================== CLOUDINARY CONFIG ===================
 cloudinary.config(
@@ -39,6 +49,67 @@ def detect_text():
 
     return jsonify({"input": text, "result": result})
 
+# =================== BATCH TEXT DETECTION ===================
+@detect_bp.route("/batch", methods=["POST"])
+def detect_batch():
+    """
+    Accepts {"texts": [...]} as JSON, or an NDJSON body where each line is
+    either a JSON string or an object with a "text" field.
+    Streams back one JSON line per input, in input order, as each batch finishes.
+    """
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        items = iter_ndjson_texts(request.stream)
+        first = next(items, None)
+        if first is None:
+            return jsonify({"error": "no texts provided"}), 400
+        items = itertools.chain([first], items)
+    else:
+        data = request.get_json(silent=True) or {}
+        texts = data.get("texts")
+        if not isinstance(texts, list) or not texts:
+            return jsonify({"error": "no texts provided"}), 400
+        items = ((text, None) for text in texts)
+
+    def generate():
+        index = 0
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= BATCH_SIZE:
+                yield from stream_batch(batch, index)
+                index += len(batch)
+                batch = []
+        if batch:
+            yield from stream_batch(batch, index)
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+def iter_ndjson_texts(stream):
+    """Yields (text, error) per non-blank line; error is set for lines that aren't valid JSON."""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            yield None, f"invalid JSON on line {line_number}"
+            continue
+        yield (item.get("text") if isinstance(item, dict) else item), None
+
+def stream_batch(batch, start_index):
+    valid = [(i, t) for i, (t, error) in enumerate(batch) if error is None and isinstance(t, str) and t.strip()]
+    results = classify_batch([t for _, t in valid], batch_size=BATCH_SIZE) if valid else []
+    by_position = {i: r for (i, _), r in zip(valid, results)}
+
+    for i, (text, error) in enumerate(batch):
+        line = {"index": start_index + i, "input": text}
+        if i in by_position:
+            line["result"] = by_position[i]
+        else:
+            line["error"] = error or "no text provided"
+        yield json.dumps(line) + "\n"
+
 # =================== IMAGE DETECTION ===================
 @detect_bp.route("/image", methods=["POST"])
 def detect_image():
@@ -51,46 +122,111 @@ def detect_image():
     if not allowed_file(f.filename, {"png", "jpg", "jpeg", "bmp", "gif"}):
         return jsonify({"error": "file type not allowed"}), 400
 
-    path = save_file(f)
+    # Keep the upload in memory (spills to a unique temp file only when very large)
+    upload = read_upload(f)
 
-    try:
-        # Upload to Cloudinary
-        upload_result = cloudinary.uploader.upload(path)
-        cloud_url = upload_result.get("secure_url")
-        if not cloud_url:
-            return jsonify({"error": "upload failed"}), 500
-
-        # Reverse Image Search via SerpAPI
-        reverse_results = serpapi_reverse_search(cloud_url)
-
-        # Rank results by fake keywords
-        ranked_results = rank_by_fake_keywords(reverse_results)
-
-        # Deepfake placeholder
-        df_result = run_deepfake_stub(path)
-
-        # 🔹 Print everything to terminal
-        print("==== IMAGE DETECTION ====")
-        print("Uploaded URL:", cloud_url)
-        print("Reverse search results:")
-        for r in ranked_results:
-            print(r)
-        print("Deepfake placeholder:", df_result)
-        print("========================\n")
-
-        return jsonify({
-            "uploaded_url": cloud_url,
-            "reverse_search_ranked": ranked_results,
-            "deepfake": df_result
-        })
+    # Near-duplicate of an image we've already checked → reuse its reverse search and skip the paid
+    # external calls. Forensics always runs: it depends on this exact file (encoding, EXIF, edits).
+    phash = image_hash(upload.source)
+    match = detect_image_index.lookup(phash)
+
+    # Remote chain (upload → reverse search) and local analysis run side by side
+    started = time.monotonic()
+    futures = {"forensics": stage_executor.submit(timed, run_forensics, upload)}
+    if match is None:
+        futures["reverse_search"] = stage_executor.submit(timed, remote_chain, upload)
+    done, not_done = wait(futures.values(), timeout=IMAGE_DETECT_DEADLINE)
+
+    stages = {}
+    outputs = {}
+    if match is not None:
+        stages["reverse_search"] = {"status": "cached", "ms": 0, "distance": match["distance"]}
+        outputs["reverse_search"] = match["value"]
+    for name, future in futures.items():
+        if future in not_done:
+            stages[name] = {"status": "timeout", "ms": round((time.monotonic() - started) * 1000)}
+            continue
+        value, error, ms = future.result()
+        stages[name] = {"status": "error" if error else "ok", "ms": ms}
+        if error:
+            stages[name]["error"] = error
+        else:
+            outputs[name] = value
+
+    # Stages still queued are dropped; the buffer is released once the running ones finish
+    release_when_done(not_done, upload.close)
+
+    cloud_url, ranked_results = outputs.get("reverse_search", (None, []))
+    df_result = outputs.get("forensics")
 
+    # 🔹 Print everything to terminal
+    print("==== IMAGE DETECTION ====")
+    print("Uploaded URL:", cloud_url)
+    print("Reverse search results:")
+    for r in ranked_results:
+        print(r)
+    print("Forensics:", df_result)
+    print("Stages:", stages)
+    print("========================\n")
+
+    if all(stage["status"] not in ("ok", "cached") for stage in stages.values()):
+        return jsonify({"error": "image analysis failed", "stages": stages}), 500
+
+    complete = all(stage["status"] in ("ok", "cached") for stage in stages.values())
+    result = {
+        "uploaded_url": cloud_url,
+        "reverse_search_ranked": ranked_results,
+        "deepfake": df_result,
+        "stages": stages,
+        "partial": not complete
+    }
+    if match is not None:
+        result["cache"] = {"hit": True, "distance": match["distance"]}
+    # Don't remember failed reverse searches
+    elif stages["reverse_search"]["status"] == "ok" and not any("error" in r for r in ranked_results):
+        detect_image_index.add(phash, (cloud_url, ranked_results))
+
+    return jsonify(result)
+
+def timed(fn, *args):
+    """Runs one pipeline stage and returns (value, error, elapsed_ms)."""
+    started = time.monotonic()
+    try:
+        value, error = fn(*args), None
     except Exception as e:
-        print("Error:", str(e))
-        return jsonify({"error": str(e)}), 500
+        print(f"Image stage {fn.__name__} failed:", str(e))
+        value, error = None, str(e)
+    return value, error, round((time.monotonic() - started) * 1000)
+
+def release_when_done(futures, release):
+    """Cancels futures that haven't started and calls release once the rest have finished."""
+    running = [f for f in futures if not f.cancel()]
+    if not running:
+        release()
+        return
+    remaining = [len(running)]
+    lock = threading.Lock()
+
+    def finished(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            release()
 
-    finally:
-        if os.path.exists(path):
-            os.remove(path)
+    for future in running:
+        future.add_done_callback(finished)
+
+def remote_chain(upload):
+    # Upload to Cloudinary straight from the buffer
+    upload_result = cloudinary.uploader.upload(upload.open(), timeout=CLOUDINARY_TIMEOUT)
+    cloud_url = upload_result.get("secure_url")
+    if not cloud_url:
+        raise RuntimeError("upload failed")
+
+    # Reverse Image Search via SerpAPI, ranked by fake keywords
+    reverse_results = serpapi_reverse_search(cloud_url)
+    return cloud_url, rank_by_fake_keywords(reverse_results)
 
 # =================== HELPER FUNCTIONS ===================
 def serpapi_reverse_search(image_url: str):
@@ -101,6 +237,7 @@ def serpapi_reverse_search(image_url: str):
             "api_key": SERPAPI_KEY
         }
         search = GoogleSearch(params)
+        search.timeout = SERPAPI_TIMEOUT
         results = search.get_dict()
 
         image_results = results.get("image_results", [])
@@ -139,8 +276,9 @@ def rank_by_fake_keywords(results):
     results.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
     return results
 
-def run_deepfake_stub(path):
-    return {
-        "note": "Deepfake detection placeholder — model integration pending",
-        "path": os.path.basename(path)
-    }
+def run_forensics(upload):
+    # Local, CPU-only manipulation checks (ELA, JPEG tables/grid, EXIF, copy-move)
+    with upload.open() as f:
+        result = analyze_image(f)
+    result["path"] = upload.filename
+    return result
@@ -0,0 +1,131 @@
+import os
+import re
+import requests
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+
+# Optional fast HTML parsers
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+try:
+    import lxml  # noqa: F401
+    BS4_PARSER = "lxml"
+except ImportError:
+    BS4_PARSER = "html.parser"
+
+# --------------------------
+# Fetch settings
+# --------------------------
+FETCH_TIMEOUT = float(os.getenv("URL_FETCH_TIMEOUT", "8"))
+FETCH_MAX_BYTES = int(os.getenv("URL_FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+# Stop downloading once the title and this many paragraphs have arrived
+FETCH_MIN_PARAGRAPHS = int(os.getenv("URL_FETCH_MIN_PARAGRAPHS", "15"))
+CHUNK_SIZE = 16 * 1024
+USER_AGENT = "Mozilla/5.0"
+
+session = requests.Session()
+session.headers.update({"User-Agent": USER_AGENT})
+adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64)
+session.mount("http://", adapter)
+session.mount("https://", adapter)
+
+AUTHOR_RE = re.compile(r"author", re.I)
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid", "ref", "ref_src", "cmpid", "ocid"}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalizes a URL for cache lookups: lowercases scheme and host, drops
+    default ports, fragments and tracking parameters (utm_* etc.), and
+    sorts the remaining query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "http"
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path or "/"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+class FetchedPage:
+    def __init__(self, url, status_code, headers, html, truncated):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.html = html
+        self.truncated = truncated
+
+
+def fetch_page(url: str, headers: dict = None) -> FetchedPage:
+    """
+    Downloads a page over the shared pooled session, streaming the body and
+    stopping at FETCH_MAX_BYTES or as soon as the title and enough
+    paragraphs have been received.
+    """
+    with session.get(url, timeout=FETCH_TIMEOUT, stream=True, headers=headers) as response:
+        if response.status_code != 200:
+            # Includes 304 Not Modified for conditional requests
+            return FetchedPage(response.url, response.status_code, response.headers, "", False)
+
+        body = bytearray()
+        seen_title = False
+        paragraphs = 0
+        scan_from = 0
+        truncated = False
+        for chunk in response.iter_content(CHUNK_SIZE):
+            body.extend(chunk)
+            # Re-scan a few bytes of the previous chunk so tags split across chunks are counted
+            window = bytes(body[scan_from:]).lower()
+            seen_title = seen_title or b"</title>" in window
+            paragraphs += window.count(b"</p>")
+            scan_from = max(len(body) - 8, scan_from)
+            overlap = bytes(body[scan_from:]).lower()
+            paragraphs -= overlap.count(b"</p>")
+
+            if len(body) >= FETCH_MAX_BYTES or (seen_title and paragraphs >= FETCH_MIN_PARAGRAPHS):
+                truncated = True
+                break
+
+        encoding = response.encoding or "utf-8"
+        html = body[:FETCH_MAX_BYTES].decode(encoding, errors="replace")
+        return FetchedPage(response.url, response.status_code, response.headers, html, truncated)
+
+
+def parse_page(html: str) -> dict:
+    """Extracts the raw title, author meta tag and paragraph text from HTML."""
+    if HTMLParser is not None:
+        tree = HTMLParser(html)
+        title_node = tree.css_first("title")
+        author = None
+        for meta in tree.css("meta"):
+            if AUTHOR_RE.search(meta.attributes.get("name") or "") and meta.attributes.get("content"):
+                author = meta.attributes["content"]
+                break
+        paragraphs = [p.text(separator=" ", strip=True) for p in tree.css("p")]
+        raw_title = title_node.text(strip=True) if title_node and title_node.text(strip=True) else None
+    else:
+        soup = BeautifulSoup(html, BS4_PARSER)
+        author_tag = soup.find(attrs={"name": AUTHOR_RE})
+        author = author_tag["content"] if author_tag and author_tag.get("content") else None
+        paragraphs = [p.get_text(separator=" ", strip=True) for p in soup.find_all("p")]
+        raw_title = soup.title.string.strip() if soup.title and soup.title.string else None
+
+    return {
+        "raw_title": raw_title or "No title found",
+        "author": author or "Unknown",
+        "paragraphs": paragraphs
+    }
@@ -1,15 +1,32 @@
-from flask import Blueprint, request, jsonify
-from models.text_model import classify_text
-from routes.utils import allowed_file, save_file
-from PIL import Image, ImageFilter, ImageOps
-import pytesseract
+from flask import Blueprint, request, jsonify, url_for
+from models.text_model import classify_text, is_reusable_result
+from routes.utils import allowed_file, read_upload
+from routes.ocr_pool import run_ocr, run_fingerprint, start_job, get_job, OCRBusy
+from models.image_index import content_hash, same_text, NearDuplicateIndex
+from models.cache import TTLCache
 import os, traceback
+from concurrent.futures import TimeoutError as FutureTimeout
 
 ocr_bp = Blueprint("ocr", __name__)
 
-# If Tesseract is not in PATH (Windows example)
-# pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+# Uploads at least this large are OCR'd as async jobs (0 = only when ?async=1 is passed)
+OCR_ASYNC_MIN_BYTES = int(os.getenv("OCR_ASYNC_MIN_BYTES", "0"))
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "10000"))
+OCR_CACHE_TTL = float(os.getenv("OCR_CACHE_TTL", "86400"))
+# Near-duplicate lookups keep a text signature (a few KB to ~40 KB) per perceptual hash
+OCR_NEAR_DUPLICATE_SIZE = int(os.getenv("OCR_NEAR_DUPLICATE_SIZE", "1000"))
+# Scans sharing one perceptual hash (same layout, different wording) remembered per hash
+OCR_SCANS_PER_HASH = 4
+
+# Scan results keyed by the uploaded file's bytes (exact repeats)...
+scan_cache = TTLCache(maxsize=OCR_CACHE_SIZE, ttl=OCR_CACHE_TTL, name="ocr-scans")
+# ...and re-encoded or resized copies found by perceptual hash. A perceptual hash alone is not
+# enough: screenshots with the same layout but different wording are within a few bits of each
+# other, so each candidate's text signature must match as well.
+scan_index = NearDuplicateIndex(maxsize=OCR_NEAR_DUPLICATE_SIZE, name="ocr")
+
+# Tesseract runs in the worker processes of routes/ocr_pool.py.
+# If Tesseract is not in PATH, set TESSERACT_CMD (e.g. C:\Program Files\Tesseract-OCR\tesseract.exe)
 @ocr_bp.route("/scan", methods=["POST"])
 def scan_image():
     if 'file' not in request.files:
@@ -22,33 +39,107 @@ def scan_image():
     if not allowed_file(f.filename, {'png', 'jpg', 'jpeg', 'bmp', 'gif'}):
         return jsonify({"error": "File type not allowed"}), 400
 
-    # Save file
+    # Read upload into memory (spills to a unique temp file only when very large)
     try:
-        path = save_file(f)
-        if not os.path.exists(path):
-            return jsonify({"error": "File could not be saved"}), 500
-        print("Saved file:", path)
+        upload = read_upload(f)
     except Exception as e:
-        print("File saving error:", traceback.format_exc())
-        return jsonify({"error": "Failed to save file", "details": str(e)}), 500
+        print("File read error:", traceback.format_exc())
+        return jsonify({"error": "Failed to read file", "details": str(e)}), 500
 
-    # OCR
+    # Re-uploads of the same file reuse the earlier OCR + classification
+    image_key = content_hash(upload.source)
+    cached = scan_cache.get(image_key)
+    if cached is not None:
+        upload.close()
+        return jsonify(dict(cached, path=upload.filename, cache={"hit": True})), 200
+
+    # Re-encoded or resized copies of an earlier scan: fingerprinted in an OCR worker, not here
     try:
-        img = Image.open(path)
-        img = img.convert("L")  # grayscale
-        img = img.filter(ImageFilter.SHARPEN)
-        img = ImageOps.autocontrast(img)
-
-        extracted_text = pytesseract.image_to_string(
-            img, lang='eng', config='--oem 1 --psm 6'
-        ).strip()
-        print("Extracted text:", extracted_text)
+        fingerprint = run_fingerprint(upload.source)
+    except OCRBusy as e:
+        upload.close()
+        return jsonify({"error": str(e)}), 429
     except Exception as e:
-        print("OCR error:", traceback.format_exc())
-        return jsonify({"error": "OCR failed", "details": str(e)}), 500
+        print(f"Image fingerprint failed: {e}")
+        fingerprint = None
+    match = find_earlier_scan(fingerprint)
+    if match is not None:
+        upload.close()
+        cached, distance = match
+        return jsonify(dict(cached, path=upload.filename, cache={"hit": True, "distance": distance})), 200
+
+    run_async = request.args.get("async", "").lower() in ("1", "true", "yes") or \
+        (OCR_ASYNC_MIN_BYTES and upload.size >= OCR_ASYNC_MIN_BYTES)
+
+    # Async: hand back a job id to poll
+    if run_async:
+        try:
+            job_id = start_job(upload.source, lambda ocr: remember_scan(image_key, fingerprint, build_scan_result(upload.filename, ocr)),
+                               cleanup=upload.close)
+        except OCRBusy as e:
+            upload.close()
+            return jsonify({"error": str(e)}), 429
+        return jsonify({
+            "job_id": job_id,
+            "status": "pending",
+            "status_url": url_for("ocr.scan_status", job_id=job_id)
+        }), 202
+
+    # OCR
+    with upload:
+        try:
+            ocr_result = run_ocr(upload.source)
+            print("Extracted text:", ocr_result["text"])
+        except OCRBusy as e:
+            return jsonify({"error": str(e)}), 429
+        except FutureTimeout:
+            return jsonify({"error": "OCR timed out"}), 504
+        except Exception as e:
+            print("OCR error:", traceback.format_exc())
+            return jsonify({"error": "OCR failed", "details": str(e)}), 500
+
+    return jsonify(remember_scan(image_key, fingerprint, build_scan_result(upload.filename, ocr_result))), 200
+
+@ocr_bp.route("/jobs/<job_id>", methods=["GET"])
+def scan_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    if job["status"] == "done":
+        return jsonify(dict(job["result"], job_id=job_id, status="done")), 200
+    if job["status"] == "failed":
+        return jsonify({"job_id": job_id, "status": "failed", "error": "OCR failed", "details": job["error"]}), 500
+    return jsonify({"job_id": job_id, "status": job["status"]}), 202
+
+def find_earlier_scan(fingerprint):
+    """(cached result, hash distance) of an earlier scan showing the same text, or None."""
+    if fingerprint is None:
+        return None
+    for match in scan_index.matches(fingerprint["phash"]):
+        for scan in reversed(match["value"]):
+            if same_text(fingerprint["signature"], scan["signature"]):
+                cached = scan_cache.get(scan["key"])
+                if cached is not None:
+                    return cached, match["distance"]
+    return None
+
+def remember_scan(image_key, fingerprint, result):
+    # Only cache scans whose classification actually ran and was fully verified
+    # (not "Model unavailable", other fallbacks, or a provider error)
+    if not (is_reusable_result(result.get("classification")) or result.get("ocr_text") == ""):
+        return result
+    scan_cache.set(image_key, result)
+    if fingerprint is not None and fingerprint["phash"] is not None:
+        same_hash = [m["value"] for m in scan_index.matches(fingerprint["phash"]) if m["distance"] == 0]
+        scans = (same_hash[0] if same_hash else [])[-(OCR_SCANS_PER_HASH - 1):]
+        scan_index.add(fingerprint["phash"], scans + [{"key": image_key, "signature": fingerprint["signature"]}])
+    return result
 
+def build_scan_result(filename, ocr_result):
+    extracted_text = ocr_result["text"]
     if not extracted_text:
-        return jsonify({"ocr_text": "", "classification": "No text detected"}), 200
+        return {"ocr_text": "", "classification": "No text detected",
+                "preprocessing": ocr_result["preprocessing"]}
 
     # Classification
     try:
@@ -60,8 +151,9 @@ def scan_image():
         print("Classification error:", traceback.format_exc())
         classification = f"Classification failed: {str(e)}"
 
-    return jsonify({
-        "path": os.path.basename(path),
+    return {
+        "path": filename,
         "ocr_text": extracted_text,
-        "classification": classification
-    })
+        "classification": classification,
+        "preprocessing": ocr_result["preprocessing"]
+    }
@@ -0,0 +1,133 @@
+import os
+import time
+import uuid
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pytesseract
+from routes.ocr_preprocess import run_pipeline
+from models.image_index import image_hash, text_signature
+
+# --------------------------
+# OCR pool settings
+# --------------------------
+TESSERACT_CMD = os.getenv("TESSERACT_CMD", r"C:\Program Files\Tesseract-OCR\tesseract.exe")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 2)))
+# Max OCR jobs running or waiting; beyond this requests get a 429
+OCR_MAX_PENDING = int(os.getenv("OCR_MAX_PENDING", str(OCR_WORKERS * 4)))
+# Threads each Tesseract process may use (OMP_THREAD_LIMIT); 1 is best when running many workers
+OCR_TESSERACT_THREADS = int(os.getenv("OCR_TESSERACT_THREADS", "1"))
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", "60"))
+# How long finished async jobs are kept for polling
+OCR_JOB_TTL = float(os.getenv("OCR_JOB_TTL", "600"))
+
+ocr_executor = None
+ocr_executor_lock = threading.Lock()
+ocr_slots = threading.BoundedSemaphore(OCR_MAX_PENDING)
+
+jobs = {}
+jobs_lock = threading.Lock()
+job_executor = ThreadPoolExecutor(max_workers=OCR_MAX_PENDING, thread_name_prefix="ocr-job")
+
+
+class OCRBusy(Exception):
+    """Raised when the OCR queue is full."""
+
+
+# --------------------------
+# Worker process side
+# --------------------------
+def init_worker(tesseract_cmd, threads):
+    os.environ["OMP_THREAD_LIMIT"] = str(threads)
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+def ocr_image(source):
+    """Returns {"text", "preprocessing"} for raw image bytes or a spill file path."""
+    return run_pipeline(source)
+
+
+def fingerprint_image(source):
+    """Perceptual hash and text signature, for finding earlier scans of the same text."""
+    return {"phash": image_hash(source), "signature": text_signature(source)}
+
+
+# --------------------------
+# Request side
+# --------------------------
+def get_executor():
+    global ocr_executor
+    if ocr_executor is None:
+        with ocr_executor_lock:
+            if ocr_executor is None:
+                # spawn keeps the (large) model memory of the web process out of the OCR workers
+                ocr_executor = ProcessPoolExecutor(
+                    max_workers=OCR_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_worker,
+                    initargs=(TESSERACT_CMD, OCR_TESSERACT_THREADS)
+                )
+    return ocr_executor
+
+
+def submit_ocr(source, task=ocr_image):
+    """Queues an OCR job (or another worker task) and returns its future. Raises OCRBusy if the queue is full."""
+    if not ocr_slots.acquire(blocking=False):
+        raise OCRBusy("OCR queue is full, try again shortly")
+    try:
+        future = get_executor().submit(task, source)
+    except Exception:
+        ocr_slots.release()
+        raise
+    future.add_done_callback(lambda _: ocr_slots.release())
+    return future
+
+
+def run_ocr(source):
+    return submit_ocr(source).result(timeout=OCR_TIMEOUT)
+
+
+def run_fingerprint(source):
+    return submit_ocr(source, fingerprint_image).result(timeout=OCR_TIMEOUT)
+
+
+def start_job(source, finish, cleanup=None):
+    """
+    Starts OCR in the background and returns a job id for polling.
+    `finish(ocr_result)` runs in this process once OCR is done and its return
+    value becomes the job result. `cleanup()` runs afterwards either way.
+    """
+    future = submit_ocr(source)
+    job_id = uuid.uuid4().hex
+    with jobs_lock:
+        expire_jobs()
+        jobs[job_id] = {"status": "pending", "created": time.time(), "result": None, "error": None}
+
+    def complete():
+        try:
+            result = finish(future.result(timeout=OCR_TIMEOUT))
+            update = {"status": "done", "result": result}
+        except Exception as e:
+            update = {"status": "failed", "error": str(e)}
+        finally:
+            if cleanup:
+                cleanup()
+        with jobs_lock:
+            if job_id in jobs:
+                jobs[job_id].update(update, finished=time.time())
+
+    job_executor.submit(complete)
+    return job_id
+
+
+def get_job(job_id):
+    with jobs_lock:
+        job = jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def expire_jobs():
+    # Caller must hold jobs_lock
+    cutoff = time.time() - OCR_JOB_TTL
+    for job_id in [j for j, job in jobs.items() if job.get("finished", time.time()) < cutoff]:
+        del jobs[job_id]
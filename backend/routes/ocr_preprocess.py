@@ -0,0 +1,160 @@
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageFilter, ImageOps
+import pytesseract
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+    np = None
+
+# --------------------------
+# Adaptive preprocessing settings
+# --------------------------
+OCR_ADAPTIVE = os.getenv("OCR_ADAPTIVE", "true").lower() in ("1", "true", "yes")
+# Images are rescaled so typical glyphs end up about this many pixels tall
+OCR_TARGET_TEXT_HEIGHT = int(os.getenv("OCR_TARGET_TEXT_HEIGHT", "28"))
+OCR_MAX_DIMENSION = int(os.getenv("OCR_MAX_DIMENSION", "2200"))
+OCR_MAX_REGIONS = int(os.getenv("OCR_MAX_REGIONS", "24"))
+# Tesseract runs per text region; >1 OCRs regions in parallel inside a worker
+OCR_REGION_THREADS = int(os.getenv("OCR_REGION_THREADS", "1"))
+TESSERACT_CONFIG = '--oem 1 --psm 6'
+
+
+def load_image(source):
+    # source is the raw image bytes, or a path for uploads that spilled to disk
+    return Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def basic_ocr(img):
+    """The original full-resolution pipeline, used when OpenCV isn't available."""
+    img = img.convert("L")  # grayscale
+    img = img.filter(ImageFilter.SHARPEN)
+    img = ImageOps.autocontrast(img)
+    return pytesseract.image_to_string(img, lang='eng', config=TESSERACT_CONFIG).strip()
+
+
+def estimate_text_height(gray):
+    """Median height of glyph-sized connected components, measured on a small copy."""
+    probe_scale = min(1.0, 1000.0 / max(gray.shape))
+    probe = cv2.resize(gray, None, fx=probe_scale, fy=probe_scale, interpolation=cv2.INTER_AREA) if probe_scale < 1 else gray
+    _, binary = cv2.threshold(probe, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    # Light text on dark backgrounds: make glyphs the minority foreground
+    if np.count_nonzero(binary) > binary.size / 2:
+        binary = cv2.bitwise_not(binary)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    glyphs = heights[(heights >= 4) & (heights <= probe.shape[0] / 8) & (widths <= heights * 4)]
+    if glyphs.size < 10:
+        return None
+    return float(np.median(glyphs)) / probe_scale
+
+
+def normalize_scale(gray):
+    """Rescales so glyphs are about OCR_TARGET_TEXT_HEIGHT px tall, capped at OCR_MAX_DIMENSION."""
+    scale = 1.0
+    text_height = estimate_text_height(gray)
+    if text_height:
+        scale = OCR_TARGET_TEXT_HEIGHT / text_height
+    scale = min(max(scale, 0.25), 2.0)
+    scale = min(scale, OCR_MAX_DIMENSION / max(gray.shape))
+    if abs(scale - 1.0) < 0.05:
+        return gray, 1.0
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation), scale
+
+
+def detect_text_regions(gray):
+    """
+    Finds text blocks with a morphological gradient + horizontal dilation and
+    returns bounding boxes (x, y, w, h) in reading order.
+    """
+    height, width = gray.shape
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, binary = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # Join characters into lines, then lines into blocks
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(9, width // 60), max(3, height // 200)))
+    connected = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+    connected = cv2.dilate(connected, cv2.getStructuringElement(cv2.MORPH_RECT, (3, max(3, OCR_TARGET_TEXT_HEIGHT // 2))))
+    contours, _ = cv2.findContours(connected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    pad = OCR_TARGET_TEXT_HEIGHT // 3
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h < OCR_TARGET_TEXT_HEIGHT * 0.5 or w < OCR_TARGET_TEXT_HEIGHT or w * h < OCR_TARGET_TEXT_HEIGHT ** 2:
+            continue
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        boxes.append((x0, y0, min(width, x + w + pad) - x0, min(height, y + h + pad) - y0))
+
+    boxes.sort(key=lambda b: (b[1] // max(1, OCR_TARGET_TEXT_HEIGHT), b[0]))
+    return boxes
+
+
+def adaptive_ocr(img):
+    """
+    Downscale → detect text regions → OCR only the cropped regions.
+    Returns (text, info) where info has per-stage timings in ms and region stats.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    gray = np.asarray(ImageOps.exif_transpose(img).convert("L"))
+    original_shape = gray.shape
+    gray, scale = normalize_scale(gray)
+    gray = cv2.normalize(gray, None, 0, 255, cv2.NORM_MINMAX)
+    timings["normalize_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    t = time.perf_counter()
+    boxes = detect_text_regions(gray)
+    covered = sum(w * h for _, _, w, h in boxes) / float(gray.size)
+    # Too many or too large regions: cropping wouldn't save anything
+    use_regions = 0 < len(boxes) <= OCR_MAX_REGIONS and covered < 0.7
+    timings["detect_ms"] = round((time.perf_counter() - t) * 1000, 1)
+
+    t = time.perf_counter()
+    if use_regions:
+        crops = [Image.fromarray(gray[y:y + h, x:x + w]) for x, y, w, h in boxes]
+        ocr = lambda crop: pytesseract.image_to_string(crop, lang='eng', config=TESSERACT_CONFIG).strip()
+        if OCR_REGION_THREADS > 1 and len(crops) > 1:
+            with ThreadPoolExecutor(max_workers=OCR_REGION_THREADS) as pool:
+                texts = list(pool.map(ocr, crops))
+        else:
+            texts = [ocr(crop) for crop in crops]
+        text = "\n".join(chunk for chunk in texts if chunk)
+    else:
+        text = pytesseract.image_to_string(Image.fromarray(gray), lang='eng', config=TESSERACT_CONFIG).strip()
+    timings["ocr_ms"] = round((time.perf_counter() - t) * 1000, 1)
+    timings["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    return text, {
+        "timings": timings,
+        "scale": round(scale, 3),
+        "original_size": [original_shape[1], original_shape[0]],
+        "regions": len(boxes) if use_regions else 0
+    }
+
+
+def run_pipeline(source):
+    """Entry point used by the OCR worker processes."""
+    started = time.perf_counter()
+    t = time.perf_counter()
+    img = load_image(source)
+    img.load()
+    decode_ms = round((time.perf_counter() - t) * 1000, 1)
+
+    if OCR_ADAPTIVE and cv2 is not None:
+        text, info = adaptive_ocr(img)
+    else:
+        t = time.perf_counter()
+        text = basic_ocr(img)
+        info = {"timings": {"ocr_ms": round((time.perf_counter() - t) * 1000, 1)}}
+
+    info["timings"]["decode_ms"] = decode_ms
+    info["timings"]["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return {"text": text, "preprocessing": info}
@@ -1,55 +1,194 @@
-from flask import Blueprint, request, jsonify
-import requests
-from bs4 import BeautifulSoup
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from urllib.parse import urlparse
-import re
-from models.text_model import classify_text  # your text classifier
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from collections import deque
+import os, re, json, time, threading
+from models.text_model import classify_text, classify_batch, is_reusable_result  # your text classifier
+from models.text_model import DEFAULT_MODEL, MODEL_REVISION, MODEL_BACKEND
+from models.domain_index import domain_reputation
+from models.cache import TTLCache
+from routes.fetch import fetch_page, parse_page, canonicalize_url
 
 url_bp = Blueprint("url", __name__)
 
+BULK_MAX_URLS = int(os.getenv("URL_BULK_MAX_URLS", "1000"))
+BULK_WORKERS = int(os.getenv("URL_BULK_WORKERS", "32"))
+BULK_PER_HOST = int(os.getenv("URL_BULK_PER_HOST", "4"))
+BULK_CLASSIFY_BATCH = int(os.getenv("URL_BULK_CLASSIFY_BATCH", "16"))
+
+# URL results are served as-is for URL_CACHE_TTL seconds, then revalidated with
+# If-None-Match / If-Modified-Since; entries are kept for URL_CACHE_MAX_AGE from the
+# original fetch, however often the page answers 304.
+URL_CACHE_TTL = float(os.getenv("URL_CACHE_TTL", "900"))
+URL_CACHE_MAX_AGE = float(os.getenv("URL_CACHE_MAX_AGE", "86400"))
+URL_CACHE_SIZE = int(os.getenv("URL_CACHE_SIZE", "4096"))
+
+url_cache = TTLCache(maxsize=URL_CACHE_SIZE, ttl=URL_CACHE_MAX_AGE, name="url")
+NOT_MODIFIED = "not-modified"
+# Entries classified by another model are re-fetched and re-classified
+MODEL_IDENTITY = [DEFAULT_MODEL, MODEL_REVISION, MODEL_BACKEND]
+
+fetch_executor = ThreadPoolExecutor(max_workers=BULK_WORKERS, thread_name_prefix="url-fetch")
+
+class HostScheduler:
+    """
+    Runs jobs on a shared executor with at most `per_host` in flight per host.
+    Jobs beyond that wait in a per-host queue and are only handed to the
+    executor when a slot on their host frees up, so a slow host never holds
+    pool workers that other hosts could use. Hosts with no work are dropped.
+    """
+
+    def __init__(self, executor, per_host):
+        self.executor = executor
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._hosts = {}  # host -> {"active": running jobs, "queue": waiting jobs}
+
+    def submit(self, host, fn, *args):
+        future = Future()
+        job = (future, fn, args)
+        with self._lock:
+            state = self._hosts.setdefault(host, {"active": 0, "queue": deque()})
+            if state["active"] >= self.per_host:
+                state["queue"].append(job)
+                return future
+            state["active"] += 1
+        self.executor.submit(self._run, host, job)
+        return future
+
+    def _run(self, host, job):
+        future, fn, args = job
+        # Cancelled while queued (e.g. the client went away): skip the work
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+        with self._lock:
+            state = self._hosts[host]
+            if not state["queue"]:
+                state["active"] -= 1
+                if state["active"] == 0:
+                    del self._hosts[host]
+                return
+            job = state["queue"].popleft()
+        self.executor.submit(self._run, host, job)
+
+host_scheduler = HostScheduler(fetch_executor, BULK_PER_HOST)
+
 # --------------------------
-# Trusted & Flagged Domains
+# Helpers
 # --------------------------
-TRUSTED_SOURCES = {
-    'reuters.com', 'apnews.com', 'bbc.com', 'bbc.co.uk',
-    'nytimes.com', 'washingtonpost.com', 'theguardian.com',
-    'wsj.com', 'bloomberg.com', 'npr.org', 'pbs.org',
-    'economist.com', 'ft.com', 'cnn.com', 'nbcnews.com',
-    'cbsnews.com', 'abcnews.go.com', 'usatoday.com',
-    'time.com', 'newsweek.com', 'politico.com', 'axios.com',
-    'thehill.com', 'propublica.org', 'latimes.com',
-    'aljazeera.com', 'dw.com', 'france24.com', 'timesnownews.com',
-    'timesofindia.indiatimes.com', 'indianexpress.com', 'firstpost.com',
-    'altnews.in', 'ddnews.gov.in','indiatoday.in'
-}
-
-FLAGGED_DOMAINS = [
-    "opindia.com", "postcard.news", "sudarshannews.in", "swarajyamag.com", "thefrustratedindian.com",
-    "kreately.in", "dainikbharat.org", "hindupost.in", "theyouth.in", "indiaspeaksdaily.com",
-    "aajkitazakhabar.com", "nationwantstoknow.com", "truepicture.in", "sirfnews.com", "thelogicalindian.com",
-    "newsroompost.com", "mynation.com", "tv9bharatvarsh.com", "vskbharat.com",
-    "bharatkhabar.com", "jankibaat.com", "hindutva.info", "dailyhunt.in", "jagran.com",
-    "amarujala.com", "punjabkesari.in", "hindi.news18.com", "oneindia.com", "newsx.com",
-    "breakingtube.com", "dailyswitch.com", "thecommune.in", "sanatanprabhat.org", "aapkikhabar.com",
-    "rashtrasamachar.com", "factorfictionindia.com", "currentaffairsindia.com", "bharattoday.in", "deshkibaat.com",
-    "indiaviralnews.com", "lokmatnews.in", "khabarindia.com", "patrika.com", "indiabulletin.com",
-    "rashtriyasamachar.com", "virarnationindia.com", "breakingbharat.com", "hindustanexpress.com", "newsnation.in",
-    "indiafastnews.com", "dailybhaskar.com", "hindustantimesbuzz.com", "yournewswire.com", "infowars.com",
-    "breitbart.com", "naturalnews.com", "thegatewaypundit.com", "worldnewsdailyreport.com", "beforeitsnews.com",
-    "americannews.com", "newswatch28.com", "empirenews.net", "nationalreport.net", "libertywritersnews.com",
-    "theonion.com", "clickhole.com", "dailybuzzlive.com", "civictribune.com", "dcgazette.com",
-    "redstatewatcher.com", "usasupreme.com", "thelastlineofdefense.org", "newsexaminer.net", "realnewsrightnow.com",
-    "therightists.com", "conservativedailypost.com", "70news.wordpress.com", "babylonbee.com", "disclose.tv",
-    "peoplesvoice.org", "politicalinsider.com", "thefederalist.com", "zerohedge.com", "rt.com",
-    "sputniknews.com", "presstv.com", "almasdarnews.com", "veteranstoday.com", "southfront.org",
-    "infostormer.com", "investmentwatchblog.com", "bigamericannews.com", "newslo.com", "channel23news.com",
-    "empireherald.com", "theresistance.info", "bostontribune.com", "dailycurrant.com", "thespoof.com",
-    "worldtruth.tv", "pakalertpress.com", "naturalsociety.com", "collective-evolution.com", "anti-media.com",
-    "intellihub.com", "neonnettle.com", "thefreethoughtproject.com", "themindunleashed.com", "politicalmayhem.news",
-    "thelibertybeacon.com", "globalresearch.ca"
-]
-
-CLEAN_FLAGGED_DOMAINS = [d.lower().replace(" ", "") for d in FLAGGED_DOMAINS]
+def get_domain(url):
+    return urlparse(url).netloc.lower().replace("www.", "")
+
+def is_trusted_domain(domain):
+    return domain_reputation.is_trusted(domain)
+
+def is_flagged_domain(domain):
+    return domain_reputation.is_flagged(domain)
+
+def trusted_result(target_url, domain):
+    return {
+        "url": target_url,
+        "domain": domain,
+        "title": "Trusted Source Content",
+        "author": "Trusted Publication",
+        "model_prediction":{
+            "prediction": "REAL"
+        },
+        "source_verification": True,
+        "final_prediction": "Authentic",
+        "summary": {
+            "content_snippet": "",
+            "reason": "This domain is a verified trusted news source."
+        }
+    }
+
+def clean_title(raw_title):
+    # Clean title while preserving possessive apostrophes (e.g., Japan's)
+    title = raw_title.strip()
+    title = re.sub(r'^[\'"“”‘’]+|[\'"“”‘’]+$', '', title)
+    title = title.rstrip(".…")
+    title = re.split(r'\s*[-–—]\s*', title)[0].strip()
+    return title
+
+def fetch_article(target_url, cached=None):
+    """
+    Fetches and parses a page. Returns (fields, error) where fields holds
+    the cleaned title, author, text content and cache validators.
+    If `cached` has validators and the server answers 304, fields is NOT_MODIFIED.
+    """
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    page = fetch_page(target_url, headers=headers or None)
+    if page.status_code == 304 and cached:
+        return NOT_MODIFIED, None
+    if page.status_code != 200:
+        return None, f"Unable to access page (status {page.status_code})"
+
+    parsed_page = parse_page(page.html)
+    return {
+        "title": clean_title(parsed_page["raw_title"]),
+        "author": parsed_page["author"],
+        "text_content": re.sub(r"\s+", " ", " ".join(parsed_page["paragraphs"]))[:3000],
+        "etag": page.headers.get("ETag"),
+        "last_modified": page.headers.get("Last-Modified")
+    }, None
+
+def get_cached_url(cache_key):
+    """Returns (entry, fresh) for a cached URL result, or (None, False)."""
+    entry = url_cache.get(cache_key)
+    if entry is None or entry.get("model") != MODEL_IDENTITY:
+        return None, False
+    return entry, time.time() - entry["checked_at"] < URL_CACHE_TTL
+
+def remember_url(cache_key, result, fields):
+    # Same rule as OCR scans: only verdicts the model produced with complete source verification
+    if not is_reusable_result(result.get("model_prediction")):
+        return
+    now = time.time()
+    url_cache.set(cache_key, {
+        "result": result,
+        "etag": fields.get("etag"),
+        "last_modified": fields.get("last_modified"),
+        "model": MODEL_IDENTITY,
+        "stored_at": now,
+        "checked_at": now
+    })
+
+def revalidated_result(cache_key, entry, target_url):
+    # Server said 304: the stored result is fresh again, but still expires URL_CACHE_MAX_AGE after it was made
+    remaining = entry["stored_at"] + URL_CACHE_MAX_AGE - time.time()
+    if remaining > 0:
+        url_cache.set(cache_key, dict(entry, checked_at=time.time()), ttl=remaining)
+    return dict(entry["result"], url=target_url)
+
+def build_url_result(target_url, domain, fields, model_pred):
+    is_flagged = is_flagged_domain(domain)
+
+    # Final decision
+    final_prediction = "Potentially Fake" if is_flagged or model_pred.get('prediction', '').upper() == 'FAKE' else "Authentic"
+    reason = "Model or domain flagged this content as fake" if final_prediction == "Potentially Fake" else "Content appears authentic"
+
+    return {
+        "url": target_url,
+        "domain": domain,
+        "title": fields["title"],
+        "author": fields["author"],
+        "model_prediction": model_pred,
+        "source_verification": is_flagged,
+        "final_prediction": final_prediction,
+        "summary": {
+            "content_snippet": fields["text_content"][:300] + "...",
+            "reason": reason
+        }
+    }
 
 # --------------------------
 # URL Analyzer
@@ -61,78 +200,127 @@ def analyze_url():
         return jsonify({"error": "Missing URL"}), 400
 
     target_url = data["url"].strip()
-    parsed = urlparse(target_url)
-    domain = parsed.netloc.lower().replace("www.", "")
+    domain = get_domain(target_url)
 
     # ✅ If in trusted sources → immediately return authentic
-    if any(domain == ts or domain.endswith("." + ts) for ts in TRUSTED_SOURCES):
-        return jsonify({
-            "url": target_url,
-            "domain": domain,
-            "title": "Trusted Source Content",
-            "author": "Trusted Publication",
-            "model_prediction":{
-                "prediction": "REAL"
-            },
-            "source_verification": True,
-            "final_prediction": "Authentic",
-            "summary": {
-                "content_snippet": "",
-                "reason": "This domain is a verified trusted news source."
-            }
-        }), 200
-
-    try:
-        # Fetch page
-        response = requests.get(target_url, timeout=8, headers={"User-Agent": "Mozilla/5.0"})
-        if response.status_code != 200:
-            return jsonify({"error": f"Unable to access page (status {response.status_code})"}), 400
-
-        # Parse title safely
-        soup = BeautifulSoup(response.text, "html.parser")
-        raw_title = soup.title.string.strip() if soup.title else "No title found"
+    if is_trusted_domain(domain):
+        return jsonify(trusted_result(target_url, domain)), 200
 
-        # Clean title while preserving possessive apostrophes (e.g., Japan's)
-        title = raw_title.strip()
-        title = re.sub(r'^[\'"“”‘’]+|[\'"“”‘’]+$', '', title)
-        title = title.rstrip(".…")
-        title = re.split(r'\s*[-–—]\s*', title)[0].strip()
+    cache_key = canonicalize_url(target_url)
+    cached, fresh = get_cached_url(cache_key)
+    if fresh:
+        return jsonify(dict(cached["result"], url=target_url)), 200
 
-        # Parse author
-        author_tag = soup.find(attrs={"name": re.compile(r"author", re.I)})
-        author = author_tag["content"] if author_tag and author_tag.get("content") else "Unknown"
+    try:
+        # Fetch page (streamed, size-capped, stops early once enough content is in)
+        fields, error = fetch_article(target_url, cached)
+        if error:
+            return jsonify({"error": error}), 400
+        if fields is NOT_MODIFIED:
+            return jsonify(revalidated_result(cache_key, cached, target_url)), 200
 
         # Run classifier on title
-        model_pred = classify_text(title)
-
-        # Extract snippet
-        paragraphs = [p.get_text(separator=" ", strip=True) for p in soup.find_all("p")]
-        text_content = re.sub(r"\s+", " ", " ".join(paragraphs))[:3000]
-
-        # Check flagged domains
-        is_flagged = any(domain == fd or domain.endswith("." + fd) for fd in CLEAN_FLAGGED_DOMAINS)
-
-        # Final decision
-        
-        final_prediction = "Potentially Fake" if is_flagged or model_pred.get('prediction', '').upper() == 'FAKE' else "Authentic"
-        reason = "Model or domain flagged this content as fake" if final_prediction == "Potentially Fake" else "Content appears authentic"
-
-        result = {
-            "url": target_url,
-            "domain": domain,
-            "title": title,
-            "author": author,
-            "model_prediction": model_pred,
-            "source_verification": is_flagged,
-            "final_prediction": final_prediction,
-            "summary": {
-                "content_snippet": text_content[:300] + "...",
-                "reason": reason
-            }
-        }
+        model_pred = classify_text(fields["title"])
+
+        result = build_url_result(target_url, domain, fields, model_pred)
+        remember_url(cache_key, result, fields)
 
         print("🔹 URL Analysis Result:", result)
         return jsonify(result), 200
 
     except Exception as e:
         return jsonify({"error": f"URL analysis failed: {str(e)}"}), 500
+
+# --------------------------
+# Bulk URL Analyzer
+# --------------------------
+@url_bp.route("/bulk", methods=["POST"])
+def analyze_bulk():
+    """
+    Accepts {"urls": [...]} and streams one NDJSON line per URL as results complete.
+    Trusted and flagged domains are answered without any network I/O; other
+    pages are fetched concurrently (limited per host) and their titles are
+    classified in batches.
+    """
+    data = request.get_json(silent=True) or {}
+    urls = data.get("urls")
+    if not isinstance(urls, list) or not urls:
+        return jsonify({"error": "Missing URLs"}), 400
+    if len(urls) > BULK_MAX_URLS:
+        return jsonify({"error": f"Too many URLs (max {BULK_MAX_URLS})"}), 400
+
+    def generate():
+        futures = {}
+        for index, raw_url in enumerate(urls):
+            if not isinstance(raw_url, str) or not raw_url.strip():
+                yield ndjson_line(index, raw_url, error="Missing URL")
+                continue
+            target_url = raw_url.strip()
+            domain = get_domain(target_url)
+            if is_trusted_domain(domain):
+                yield ndjson_line(index, target_url, result=trusted_result(target_url, domain))
+            elif is_flagged_domain(domain):
+                yield ndjson_line(index, target_url, result=flagged_result(target_url, domain))
+            else:
+                cache_key = canonicalize_url(target_url)
+                cached, fresh = get_cached_url(cache_key)
+                if fresh:
+                    yield ndjson_line(index, target_url, result=dict(cached["result"], url=target_url))
+                    continue
+                future = host_scheduler.submit(domain, fetch_article, target_url, cached)
+                futures[future] = (index, target_url, domain, cache_key, cached)
+
+        try:
+            # Classify fetched titles in batches as pages arrive
+            ready = []
+            remaining = len(futures)
+            for future in as_completed(futures):
+                remaining -= 1
+                index, target_url, domain, cache_key, cached = futures[future]
+                try:
+                    fields, error = future.result()
+                except Exception as e:
+                    fields, error = None, f"URL analysis failed: {str(e)}"
+                if error:
+                    yield ndjson_line(index, target_url, error=error)
+                elif fields is NOT_MODIFIED:
+                    yield ndjson_line(index, target_url, result=revalidated_result(cache_key, cached, target_url))
+                else:
+                    ready.append((index, target_url, domain, cache_key, fields))
+
+                if ready and (len(ready) >= BULK_CLASSIFY_BATCH or remaining == 0):
+                    predictions = classify_batch([item[4]["title"] for item in ready], batch_size=BULK_CLASSIFY_BATCH)
+                    for (index, target_url, domain, cache_key, fields), model_pred in zip(ready, predictions):
+                        result = build_url_result(target_url, domain, fields, model_pred)
+                        remember_url(cache_key, result, fields)
+                        yield ndjson_line(index, target_url, result=result)
+                    ready = []
+        finally:
+            # Don't fetch pages nobody will read
+            for future in futures:
+                future.cancel()
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+def flagged_result(target_url, domain):
+    return {
+        "url": target_url,
+        "domain": domain,
+        "title": "",
+        "author": "Unknown",
+        "model_prediction": None,
+        "source_verification": True,
+        "final_prediction": "Potentially Fake",
+        "summary": {
+            "content_snippet": "",
+            "reason": "This domain is flagged for publishing misleading content."
+        }
+    }
+
+def ndjson_line(index, url, result=None, error=None):
+    line = {"index": index, "url": url}
+    if error:
+        line["error"] = error
+    else:
+        line["result"] = result
+    return json.dumps(line) + "\n"
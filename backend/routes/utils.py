@@ -1,14 +1,57 @@
+import io
 import os
+import shutil
+import tempfile
 from werkzeug.utils import secure_filename
-from config import UPLOAD_FOLDER
+from config import UPLOAD_FOLDER, UPLOAD_SPILL_BYTES
 ALLOWED_IMG = {'png','jpg','jpeg','bmp','gif'}
 ALLOWED_VIDEO = {'mp4','mov','avi','mkv'}
 
 def allowed_file(filename, allowed_set):
     return '.' in filename and filename.rsplit('.',1)[1].lower() in allowed_set
 
-def save_file(file):
+class Upload:
+    """
+    An uploaded file held in memory, or spilled to a uniquely named temp
+    file when it is larger than UPLOAD_SPILL_BYTES.
+    """
+
+    def __init__(self, filename, data=None, path=None, size=0):
+        self.filename = filename
+        self.data = data
+        self.path = path
+        self.size = size
+
+    @property
+    def source(self):
+        """Bytes for in-memory uploads, otherwise the spill file path."""
+        return self.data if self.data is not None else self.path
+
+    def open(self):
+        return io.BytesIO(self.data) if self.data is not None else open(self.path, "rb")
+
+    def close(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+        self.data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_upload(file, spill_bytes=UPLOAD_SPILL_BYTES):
+    """Reads a werkzeug FileStorage without touching disk unless it exceeds spill_bytes."""
     filename = secure_filename(file.filename)
-    path = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(path)
-    return path
+    head = file.stream.read(spill_bytes + 1)
+    if len(head) <= spill_bytes:
+        return Upload(filename, data=head, size=len(head))
+
+    suffix = os.path.splitext(filename)[1]
+    with tempfile.NamedTemporaryFile(dir=UPLOAD_FOLDER, suffix=suffix, delete=False) as tmp:
+        tmp.write(head)
+        shutil.copyfileobj(file.stream, tmp)
+        size = tmp.tell()
+    return Upload(filename, path=tmp.name, size=size)